@@ -1,33 +1,147 @@
 """
 This script is used for writing mysql data into csv
+
+Rows are streamed from an unbuffered (server-side) cursor and written in
+chunks, so tables larger than memory are exported at constant memory. Output
+is csv, gzip compressed csv, or Parquet when pyarrow is installed.
+
+Usage: python mysql2csv.py project_cve_table vulnerable_project_in_huntre --output-dir ../dataset --format csv.gz
 """
-import pymysql
+import os
 import csv
+import time
+import gzip
+import argparse
+import pymysql
+import pymysql.cursors
 
+CHUNK_SIZE = 10000
+FORMATS = ("csv", "csv.gz", "parquet")
 
-def main(table_name, target_path):
-    conn = pymysql.connect(
+
+def connect():
+    return pymysql.connect(
         host="localhost",
         user="root",
         password="SteinsGate0",
         database="oss_security_estimator",
         charset="utf8"
     )
-    cursor = conn.cursor()
-    cursor.execute(f"SELECT COLUMN_NAME FROM information_schema.COLUMNS WHERE TABLE_SCHEMA ="
-                   f" 'oss_security_estimator' AND TABLE_NAME = '{table_name}'")
-    column_names = cursor.fetchall()
-    label = []
-    for column_name in column_names:
-        label.append(column_name[0])
-    cursor.execute(f"select * from {table_name}")
-    data = cursor.fetchall()
-    with open(target_path, "w", newline="") as t:
+
+
+def iter_chunks(cursor, chunk_size):
+    while True:
+        rows = cursor.fetchmany(chunk_size)
+        if not rows:
+            return
+        yield rows
+
+
+# Arrow types of the MySQL data types in information_schema.columns, other types (decimals, times, enums...) are
+# kept as text. TEXT columns are strings, only binary strings and BLOB columns are binary.
+_ARROW_TYPE_NAMES_ = {
+    "tinyint": "int64", "smallint": "int64", "mediumint": "int64", "int": "int64", "bigint": "int64",
+    "year": "int64", "float": "float64", "double": "float64", "date": "date32", "datetime": "timestamp",
+    "timestamp": "timestamp", "binary": "binary", "varbinary": "binary", "tinyblob": "binary", "blob": "binary",
+    "mediumblob": "binary", "longblob": "binary"
+}
+
+
+def _get_arrow_type_(data_type):
+    import pyarrow
+
+    type_name = _ARROW_TYPE_NAMES_.get(data_type.lower(), "string")
+    if type_name == "timestamp":
+        return pyarrow.timestamp("us")
+
+    return getattr(pyarrow, type_name)()
+
+
+# Return (name, data type) of the columns of a table, in the order select * returns them.
+def get_columns(conn, table_name):
+    with conn.cursor() as cursor:
+        cursor.execute("select column_name, data_type from information_schema.columns where table_schema = database() "
+                       "and table_name = %s order by ordinal_position", table_name)
+        return list(cursor.fetchall())
+
+
+def write_csv(chunks, label, target_path, compress=False):
+    row_count = 0
+    opener = gzip.open if compress else open
+    with opener(target_path, "wt", newline="", encoding="utf-8") as t:
         writer = csv.writer(t)
         writer.writerow(label)
-        writer.writerows(data)
-    print("data has been written into csv file")
+        for rows in chunks:
+            writer.writerows(rows)
+            row_count += len(rows)
+
+    return row_count
+
+
+# columns are (name, data type) of the columns, as returned by get_columns.
+def write_parquet(chunks, columns, target_path):
+    # Parquet output is optional, pyarrow is only imported for it.
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        pyarrow = None
+    assert pyarrow, "pyarrow needs to be installed for Parquet output."
+    schema = pyarrow.schema([(name, _get_arrow_type_(data_type)) for name, data_type in columns])
+    row_count = 0
+    with pyarrow.parquet.ParquetWriter(target_path, schema) as writer:
+        for rows in chunks:
+            arrays = []
+            for i, field in enumerate(schema):
+                values = [row[i] for row in rows]
+                if field.type == pyarrow.string():
+                    values = [None if value is None else str(value) for value in values]
+                arrays.append(pyarrow.array(values, type=field.type))
+            writer.write_table(pyarrow.Table.from_arrays(arrays, schema=schema))
+            row_count += len(rows)
+
+    return row_count
+
+
+def export_table(conn, table_name, target_path, output_format="csv", chunk_size=CHUNK_SIZE):
+    start_time = time.time()
+    columns = get_columns(conn, table_name) if output_format == "parquet" else None
+    # Unbuffered cursor, rows are read from the server as they are written.
+    cursor = conn.cursor(pymysql.cursors.SSCursor)
+    try:
+        cursor.execute(f"select * from `{table_name}`")
+        chunks = iter_chunks(cursor, chunk_size)
+        if output_format == "parquet":
+            row_count = write_parquet(chunks, columns, target_path)
+        else:
+            label = [column[0] for column in cursor.description]
+            row_count = write_csv(chunks, label, target_path, compress=output_format == "csv.gz")
+    finally:
+        cursor.close()
+
+    elapsed = time.time() - start_time
+    print(f"{table_name}: {row_count} rows written into {target_path} in {elapsed:.1f}s "
+          f"({row_count / elapsed if elapsed else 0:.0f} rows/s)")
+    return row_count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export MySQL tables.")
+    parser.add_argument("tables", nargs="+", help="tables to export")
+    parser.add_argument("--output-dir", default="../dataset", help="directory the files are written into")
+    parser.add_argument("--format", choices=FORMATS, default="csv", help="output format (default: csv)")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="rows fetched and written at once")
+    args = parser.parse_args()
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    conn = connect()
+    try:
+        for table_name in args.tables:
+            target_path = os.path.join(args.output_dir, f"{table_name}.{args.format}")
+            export_table(conn, table_name, target_path, args.format, args.chunk_size)
+    finally:
+        conn.close()
 
 
 if __name__ == "__main__":
-    main("project_cve_table", "D:/PycharmProjects/oss_sec_estimator/dataset/project_cve.csv")
+    main()
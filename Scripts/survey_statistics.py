@@ -0,0 +1,62 @@
+"""
+Statistics of the report fix surveys written by github_report_fix_survey.py
+
+A survey is loaded once with explicit dtypes and reduced to per-year counts by
+a single groupby, statistics for any year cut-off are then sums over the
+per-year counts instead of passes over the rows.
+"""
+
+ATTR_TUPLE = ("REFER TO COMMIT",
+              "REFER TO ISSUE",
+              "REFER TO RELEASE",
+              "REFER TO ADVISORY",
+              "REFER TO PULL",
+              "REFER TO HUNTR")
+YEAR_COLUMN = "PUBLISH YEAR"
+TOTAL_COLUMN = "TOTAL"
+# valid rows indicate rows that with at least one hyperlink refers to those mention before
+VALID_COLUMN = "VALID REFERENCE"
+
+STATISTIC_LABELS = (
+    (TOTAL_COLUMN, "total CVE in dataframe"),
+    ("REFER TO COMMIT", "CVE refers to commit"),
+    ("REFER TO ISSUE", "CVE refers to issue"),
+    ("REFER TO RELEASE", "CVE refers to release"),
+    ("REFER TO ADVISORY", "CVE refers to security advisory"),
+    ("REFER TO PULL", "CVE refers to pull"),
+    ("REFER TO HUNTR", "CVE refers to huntr"),
+    (VALID_COLUMN, "Valid CVEs")
+)
+
+
+def load_survey(path):
+    import pandas
+
+    dtype = {attr: "int8" for attr in ATTR_TUPLE}
+    dtype["CVE ID"] = "string"
+    data_frame = pandas.read_csv(path, usecols=("CVE ID",) + ATTR_TUPLE, dtype=dtype)
+    # CVE IDs are CVE-YYYY-NNNN, the year is sliced out of every ID at once.
+    data_frame[YEAR_COLUMN] = data_frame["CVE ID"].str.slice(4, 8).astype("int16")
+    return data_frame
+
+
+# Return a frame indexed by year, with the number of CVEs, of CVEs per reference type and of valid CVEs.
+def get_year_counts(data_frame):
+    attrs = data_frame.loc[:, ATTR_TUPLE]
+    counts = attrs.astype("int64")
+    counts[TOTAL_COLUMN] = 1
+    counts[VALID_COLUMN] = attrs.any(axis=1).astype("int64")
+    counts[YEAR_COLUMN] = data_frame[YEAR_COLUMN]
+    return counts.groupby(YEAR_COLUMN).sum().loc[:, (TOTAL_COLUMN,) + ATTR_TUPLE + (VALID_COLUMN,)]
+
+
+# Return the counts of CVEs published in since or later, of all CVEs if since is None.
+def get_statistics(year_counts, since=None):
+    if since is not None:
+        year_counts = year_counts[year_counts.index >= since]
+
+    return year_counts.sum()
+
+
+def format_statistics(statistics):
+    return "\n".join(f"{label}: {statistics[column]}" for column, label in STATISTIC_LABELS)
@@ -2,109 +2,182 @@ import requests
 import json
 import pymysql
 import os
+import sys
 
-os.environ["http_proxy"] = "http://127.0.0.1:33210"
-os.environ["https_proxy"] = "http://127.0.0.1:33210"
-
+# The local NVD mirror of the estimator, built with main/nvd_store.py.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "main"))
+from nvd_store import get_nvd_store
 
 headers = {
     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) "
                   "Chrome/99.0.4844.51 Safari/537.36 "
 }
 
-conn = pymysql.connect(
-    host="localhost",
-    user="root",
-    password="SteinsGate0",
-    database="oss_security_estimator",
-    charset="utf8"
-)
+# Pairs are written in transactions of this many rows.
+BATCH_SIZE = 1000
+CHECKPOINT_STAGE = "nvd_enrichment"
+UNIQUE_INDEX_NAME = "project_cve_table_cve_number"
+# A CVE already in the table is left as it is.
+INSERT_SQL = "insert into project_cve_table (github_project_relative_path, cve_number) values (%s, %s) " \
+             "on duplicate key update cve_number = cve_number"
 
-cursor = conn.cursor()
 
-# initialization
-sql1 = "select github_project_relative_path, cve_number from vulnerable_project_in_huntre group by " \
-       "github_project_relative_path, cve_number "
-cursor.execute(sql1)
-vulnerable_project_in_huntre_fetch_results = cursor.fetchall()
-cursor.close()
-
-# for result in vulnerable_project_in_huntre_fetch_results:
-sql2 = "insert into project_cve_table (github_project_relative_path, cve_number) values (%s, %s)"
-cursor = conn.cursor()
-try:
-    cursor.executemany(sql2, vulnerable_project_in_huntre_fetch_results)
+def connect():
+    return pymysql.connect(
+        host="localhost",
+        user="root",
+        password="SteinsGate0",
+        database="oss_security_estimator",
+        charset="utf8"
+    )
+
+
+def insert_pairs(conn, pairs, last_project=None):
+    with conn.cursor() as cursor:
+        for i in range(0, len(pairs), BATCH_SIZE):
+            cursor.executemany(INSERT_SQL, pairs[i: i + BATCH_SIZE])
+        if last_project is not None:
+            # Recorded in the same transaction as the pairs of the project.
+            cursor.execute("insert into enrich_checkpoint (stage, last_project) values (%s, %s) "
+                           "on duplicate key update last_project = values(last_project)",
+                           (CHECKPOINT_STAGE, last_project))
     conn.commit()
-except pymysql.err.OperationalError as e:
-    conn.rollback()
-    print("initialization error")
-finally:
-    cursor.close()
-
-# information enrichment
-cursor = conn.cursor()
-sql3 = "select * from project_cve_table"
-cursor.execute(sql3)
-project_cve_table_fetch_results = cursor.fetchall()
-cursor.close()
-
-nvd_api_key = os.getenv("NVD_API_KEY")
-assert nvd_api_key, "NVD_API_KEY needs to be set."
-url = "https://services.nvd.nist.gov/rest/json/cves/1.0/"
-
-for result in project_cve_table_fetch_results:
+
+
+# One project per CVE, enforced by a unique index on cve_number. Creating it drops the rows of a CVE but the
+# first one, which only happens with migrate set (--migrate-unique-cve-number).
+def ensure_unique_cve_number(conn, migrate=False):
+    with conn.cursor() as cursor:
+        cursor.execute("create table if not exists enrich_checkpoint (stage varchar(64) primary key, "
+                       "last_project varchar(255))")
+        cursor.execute("select count(*) from information_schema.statistics where table_schema = database() and "
+                       "table_name = 'project_cve_table' and index_name = %s", UNIQUE_INDEX_NAME)
+        if cursor.fetchone()[0]:
+            return
+
+        if not migrate:
+            sys.exit("project_cve_table has no unique index on cve_number, run once with "
+                     "--migrate-unique-cve-number to drop the duplicate CVEs and create it")
+
+        cursor.execute("select column_name from information_schema.key_column_usage where table_schema = database() "
+                       "and table_name = 'project_cve_table' and constraint_name = 'PRIMARY'")
+        primary_key = cursor.fetchone()
+        if primary_key is None:
+            sys.exit("project_cve_table has no primary key to tell its duplicate CVEs apart")
+
+        try:
+            cursor.execute(f"delete t1 from project_cve_table t1 join project_cve_table t2 "
+                           f"on t1.cve_number = t2.cve_number and t1.{primary_key[0]} > t2.{primary_key[0]}")
+            print(f"removed {cursor.rowcount} duplicate CVE rows from project_cve_table")
+            conn.commit()
+        except pymysql.err.OperationalError:
+            conn.rollback()
+            raise
+
+        cursor.execute(f"alter table project_cve_table add unique index {UNIQUE_INDEX_NAME} (cve_number)")
+
+
+# initialization
+def initialize(conn):
+    with conn.cursor() as cursor:
+        cursor.execute("select github_project_relative_path, cve_number from vulnerable_project_in_huntre group by "
+                       "github_project_relative_path, cve_number")
+        vulnerable_project_in_huntre_fetch_results = cursor.fetchall()
+
+    try:
+        insert_pairs(conn, list(vulnerable_project_in_huntre_fetch_results))
+    except pymysql.err.OperationalError:
+        conn.rollback()
+        print("initialization error")
+
+
+def iter_nvd_cve_numbers(session, keyword, nvd_api_key):
+    url = "https://services.nvd.nist.gov/rest/json/cves/1.0/"
     params = {
-        "keyword": result[0],
+        "keyword": keyword,
         "apiKey": nvd_api_key,
-        "resultsPerPage": 2000
+        "resultsPerPage": 2000,
+        "startIndex": 0
     }
-    response = requests.get(url=url, params=params)
-    data = json.loads(response.content)
-    result_per_page = data["resultsPerPage"]
-    starIndex = data["startIndex"]
-    total_result = data["totalResults"]
-    while starIndex < total_result:
-        if starIndex:
-            params["startIndex"] = starIndex
-            data = json.loads(requests.get(url=url, params=params).content)
-            _result = data["result"]
-        else:
-            _result = data["result"]
-
-        items = _result["CVE_Items"]
-        for item in items:
-            cve_number = item["cve"]["CVE_data_meta"]["ID"]
-            sql3 = "select count(*) from project_cve_table where cve_number = %s"
-            cursor = conn.cursor()
-            cursor.execute(sql3, cve_number)
-            count = cursor.fetchone()[0]
-            if count == 0:
-                try:
-                    cursor = conn.cursor()
-                    sql4 = "insert into project_cve_table values (%s, %s)"
-                    cursor.execute(sql4, (result[0], cve_number))
-                    conn.commit()
-                except Exception as e:
-                    conn.rollback()
-                    print("error occurred when insert data", e)
-                    print(cve_number)
-                finally:
-                    cursor.close()
-            else:
-                cursor.close()
-
-        starIndex += result_per_page
+    total_result = None
+    while total_result is None or params["startIndex"] < total_result:
+        data = json.loads(session.get(url=url, params=params).content)
+        total_result = data["totalResults"]
+        for item in data["result"]["CVE_Items"]:
+            yield item["cve"]["CVE_data_meta"]["ID"]
+
+        params["startIndex"] += data["resultsPerPage"]
+
+
+# CVEs referencing the project, answered from the local NVD mirror when it exists, by the NVD API otherwise.
+def get_cve_numbers(session, project, nvd_store, nvd_api_key):
+    if nvd_store is not None:
+        return nvd_store.get_cve_numbers(project)
+
+    return iter_nvd_cve_numbers(session, project, nvd_api_key)
+
+
+# information enrichment, resumes after the last project recorded in enrich_checkpoint
+def enrich(conn):
+    nvd_store = get_nvd_store()
+    nvd_api_key = os.getenv("NVD_API_KEY")
+    assert nvd_store or nvd_api_key, "NVD_API_KEY needs to be set when there is no local NVD mirror."
+
+    with conn.cursor() as cursor:
+        cursor.execute("select last_project from enrich_checkpoint where stage = %s", CHECKPOINT_STAGE)
+        checkpoint = cursor.fetchone()
+        last_project = checkpoint[0] if checkpoint else ""
+        cursor.execute("select cve_number from project_cve_table")
+        known_cve_numbers = {cve_number for cve_number, in cursor.fetchall()}
+        cursor.execute("select distinct github_project_relative_path from project_cve_table "
+                       "where github_project_relative_path > %s order by github_project_relative_path", last_project)
+        projects = [project for project, in cursor.fetchall()]
+
+    failed = False
+    with requests.Session() as session:
+        session.headers.update(headers)
+        for project in projects:
+            pairs = []
+            for cve_number in get_cve_numbers(session, project, nvd_store, nvd_api_key):
+                if cve_number in known_cve_numbers:
+                    continue
+                known_cve_numbers.add(cve_number)
+                pairs.append((project, cve_number))
+
+            try:
+                # The checkpoint stays before a failed project, so the next run retries it.
+                insert_pairs(conn, pairs, None if failed else project)
+            except pymysql.err.MySQLError as e:
+                conn.rollback()
+                failed = True
+                print("error occurred when insert data of", project, e)
+
+    if not failed:
+        # Every project is enriched, the next run starts from the first project again.
+        with conn.cursor() as cursor:
+            cursor.execute("delete from enrich_checkpoint where stage = %s", CHECKPOINT_STAGE)
+        conn.commit()
+
 
 # data cleaning
-sql5 = "delete from project_cve_table where cve_number = ''"
-try:
-    cursor = conn.cursor()
-    cursor.execute(sql5)
-    conn.commit()
-except pymysql.err.OperationalError as e:
-    print("error occurred in data cleaning stage")
-    conn.rollback()
-finally:
-    cursor.close()
+def clean(conn):
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("delete from project_cve_table where cve_number = ''")
+        conn.commit()
+    except pymysql.err.OperationalError:
+        print("error occurred in data cleaning stage")
+        conn.rollback()
+
 
-conn.close()
+if __name__ == "__main__":
+    os.environ["http_proxy"] = "http://127.0.0.1:33210"
+    os.environ["https_proxy"] = "http://127.0.0.1:33210"
+    conn = connect()
+    try:
+        ensure_unique_cve_number(conn, "--migrate-unique-cve-number" in sys.argv[1:])
+        initialize(conn)
+        enrich(conn)
+        clean(conn)
+    finally:
+        conn.close()
@@ -0,0 +1,65 @@
+"""
+
+Micro-benchmark of the HTML extraction backends over saved pages.
+
+Every installed backend runs each extraction on its fixture page, its result
+is checked against the bs4 reference and the time per page is reported.
+
+Usage: python html_extract_benchmark.py [--repeat 50] [--fixtures fixtures/html]
+
+"""
+
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "main"))
+
+from html_extract import BACKENDS
+
+# (fixture, extraction) pairs, one per scrape of the estimator.
+CASES = [
+    ("dependencies.html", "get_dependency_hrefs", ()),
+    ("cvekey.html", "get_cve_numbers", ()),
+    ("cvename.html", "get_cve_record", ()),
+    ("huntr.html", "get_huntr_reported_on", ()),
+    ("advisory.html", "get_relative_time", ("relative-time",)),
+    ("release.html", "get_relative_time", ("relative-time",))
+]
+
+
+def run(fixtures_path, repeat):
+    reference = BACKENDS.get("bs4")
+    rows = []
+    for fixture, method, args in CASES:
+        with open(os.path.join(fixtures_path, fixture), encoding="utf-8") as f:
+            html = f.read()
+        expected = getattr(reference, method)(html, *args) if reference else None
+        for name, extractor in BACKENDS.items():
+            extract = getattr(extractor, method)
+            start_time = time.perf_counter()
+            for _ in range(repeat):
+                result = extract(html, *args)
+            elapsed = (time.perf_counter() - start_time) / repeat
+            matches = "-" if reference is None else ("yes" if result == expected else "NO")
+            rows.append((fixture, method, name, elapsed * 1000, matches))
+
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the HTML extraction backends.")
+    parser.add_argument("--repeat", type=int, default=50, help="runs of each extraction")
+    parser.add_argument("--fixtures", default=os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                           "fixtures", "html"),
+                        help="directory of the saved pages")
+    args = parser.parse_args()
+
+    print(f"{'fixture':<20}{'extraction':<24}{'backend':<12}{'ms/page':>10}  matches bs4")
+    for fixture, method, name, milliseconds, matches in run(args.fixtures, args.repeat):
+        print(f"{fixture:<20}{method:<24}{name:<12}{milliseconds:>10.3f}  {matches}")
+
+
+if __name__ == "__main__":
+    main()
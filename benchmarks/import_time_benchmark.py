@@ -0,0 +1,90 @@
+"""
+
+Import time budget of the command line entry points and worker processes.
+
+Each module is imported in a fresh interpreter with python -X importtime, and
+the best cumulative import time of a few runs is checked against its budget.
+Heavy dependencies (PyGithub, requests, parsers, pandas...) are only to be
+imported by the code paths needing them, so each entry point also lists the
+modules it must not import. Any budget exceeded or module imported fails the
+check.
+
+Usage: python import_time_benchmark.py [--repeat 5] [--scale 1.0]
+
+"""
+
+import os
+import re
+import sys
+import argparse
+import subprocess
+
+ROOT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+# Dependencies the command lines do not need before scoring a repository.
+CLI_DEFERRED = ("github", "requests", "yaml", "bs4", "lxml.html", "selectolax.lexbor", "httpx", "pandas")
+
+# (directory, module, budget in milliseconds, modules it must not import)
+ENTRY_POINTS = [
+    ("main", "batch", 150, CLI_DEFERRED),
+    ("main", "run", 100, CLI_DEFERRED),
+    ("main", "results_store", 100, CLI_DEFERRED),
+    ("main", "cve_index", 100, CLI_DEFERRED),
+    ("main", "nvd_store", 100, CLI_DEFERRED),
+    ("main", "http_replay", 150, CLI_DEFERRED),
+    # Workers need PyGithub and requests, parsers and yaml wait for the first page or workflow.
+    ("main", "github_repository", 600, ("yaml", "bs4", "lxml.html", "selectolax.lexbor", "httpx", "pandas")),
+    ("Scripts", "survey_statistics", 100, ("pandas",)),
+    ("Scripts", "mysql2csv", 150, ("pyarrow",))
+]
+
+_IMPORT_TIME_REGEX_ = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+
+# Return (cumulative import time of module in milliseconds, names of the modules imported).
+def measure(directory, module):
+    process = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                             cwd=os.path.join(ROOT_PATH, directory), capture_output=True, text=True)
+    if process.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{process.stderr}")
+
+    cumulative = None
+    imported = set()
+    for line in process.stderr.splitlines():
+        match = _IMPORT_TIME_REGEX_.match(line)
+        if match is None:
+            continue
+        imported.add(match.group(4))
+        if match.group(4) == module and len(match.group(3)) == 1:
+            cumulative = int(match.group(2)) / 1000
+
+    return cumulative, imported
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the import time budget of the entry points.")
+    parser.add_argument("--repeat", type=int, default=5, help="imports of each module, the best one is kept")
+    parser.add_argument("--scale", type=float, default=1.0, help="factor applied to every budget, for slow machines")
+    args = parser.parse_args()
+
+    failures = []
+    print(f"{'module':<30}{'ms':>10}{'budget':>10}  deferred modules imported")
+    for directory, module, budget, deferred in ENTRY_POINTS:
+        runs = [measure(directory, module) for _ in range(args.repeat)]
+        milliseconds = min(cumulative for cumulative, _ in runs)
+        imported = sorted(name for name in deferred if name in runs[0][1])
+        budget *= args.scale
+        print(f"{directory + '/' + module:<30}{milliseconds:>10.1f}{budget:>10.0f}  {', '.join(imported)}")
+        if milliseconds > budget:
+            failures.append(f"{module} imports in {milliseconds:.1f}ms, budget {budget:.0f}ms")
+        if imported:
+            failures.append(f"{module} imports {', '.join(imported)}")
+
+    for failure in failures:
+        print(f"FAILED {failure}", file=sys.stderr)
+
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,69 @@
+"""
+
+Record the HTTP traffic of scoring the benchmark repositories.
+
+Each metric of PARAMS is computed once per repository, against the live
+GitHub, NVD and cve.mitre.org, with every request and response appended to
+the fixture archive. The errors of the metrics are written next to the
+archive, the replay benchmark fails on any other error. GITHUB_AUTH_TOKEN and
+NVD_API_KEY need to be set.
+
+Usage: python record_fixtures.py [repos.txt] [--archive fixtures/replay.jsonl.gz]
+
+"""
+
+import os
+import sys
+import json
+import argparse
+import tempfile
+
+BENCHMARKS_PATH = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCHMARKS_PATH, "..", "main"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record fixtures of the replay benchmark.")
+    parser.add_argument("repos", nargs="?", default=os.path.join(BENCHMARKS_PATH, "repos.txt"))
+    parser.add_argument("--archive", default=os.path.join(BENCHMARKS_PATH, "fixtures", "replay.jsonl.gz"))
+    args = parser.parse_args()
+
+    repos_file = os.path.abspath(args.repos)
+    archive = os.path.abspath(args.archive)
+    os.makedirs(os.path.dirname(archive), exist_ok=True)
+    # Every request has to reach the network: no conditional requests, and the persistent caches of the
+    # estimator (relative to the working directory) start empty.
+    os.environ["OSS_RECORD_PATH"] = archive
+    os.environ["OSS_HTTP_CACHE"] = "0"
+    os.chdir(tempfile.mkdtemp(prefix="record_fixtures_"))
+    os.mkdir("main")
+    os.chdir("main")
+
+    from run import get_metric_names
+    from batch import read_repo_urls
+    from github_repository import get_repository
+    from replay_benchmark import reset_caches, get_record_errors_path
+    from transport import get_transport
+
+    with open(repos_file, encoding="utf-8") as f:
+        repo_urls = read_repo_urls(f)
+
+    errors = {}
+    for repo_url in repo_urls:
+        for metric_name in get_metric_names():
+            # The same fresh state as the benchmark, so it replays the same requests.
+            reset_caches()
+            try:
+                getattr(get_repository(repo_url), metric_name)
+                print(f"{repo_url} {metric_name}: recorded", file=sys.stderr)
+            except Exception as e:
+                errors.setdefault(repo_url, {})[metric_name] = f"{type(e).__name__}: {e}"
+                print(f"{repo_url} {metric_name}: {type(e).__name__}: {e}", file=sys.stderr)
+
+    get_transport().close()
+    with open(get_record_errors_path(archive), "w", encoding="utf-8") as f:
+        json.dump(errors, f, indent=2, sort_keys=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+"""
+
+End-to-end benchmark of every metric of PARAMS against recorded traffic.
+
+The fixture archive written by record_fixtures.py is served by the replay
+server, and each metric of each repository is computed on a fresh repository
+object with empty caches. Wall time, request count, requests missing from the
+archive and peak memory are reported per metric. The request counts are
+compared with the baseline, and any metric making more requests than its
+baseline fails the benchmark, as do requests missing from the archive and
+metrics failing that did not fail when the archive was recorded.
+
+Usage: python replay_benchmark.py [repos.txt] [--archive fixtures/replay.jsonl.gz] [--latency 0.02]
+                                  [--baseline baseline.json] [--update-baseline] [--output results.json]
+
+"""
+
+import gc
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import tracemalloc
+
+BENCHMARKS_PATH = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCHMARKS_PATH, "..", "main"))
+
+from constants import CACHE_PATH
+from http_replay import ReplayServer, load_fixtures
+
+
+# Drop the caches kept across repositories, so every metric is measured from a cold start.
+def reset_caches():
+    import user_cache
+    import dependency_graph
+
+    for module, name in ((user_cache, "_USER_PROFILE_CACHE"), (dependency_graph, "_DEPENDENCY_GRAPH")):
+        store = getattr(module, name)
+        if store is not None:
+            store.close()
+            setattr(module, name, None)
+    shutil.rmtree(CACHE_PATH, ignore_errors=True)
+
+
+# Errors of the metrics when the archive was recorded, written by record_fixtures.py next to it.
+def get_record_errors_path(archive):
+    return archive[: -len(".jsonl.gz")] + ".errors.json" if archive.endswith(".jsonl.gz") else archive + ".errors.json"
+
+
+def measure(server, repo_url, metric_name):
+    from github_repository import get_repository
+
+    reset_caches()
+    gc.collect()
+    request_count = server.request_count
+    miss_count = server.miss_count
+    memory_before = tracemalloc.get_traced_memory()[0]
+    tracemalloc.reset_peak()
+    error = None
+    start_time = time.perf_counter()
+    try:
+        getattr(get_repository(repo_url), metric_name)
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    wall_time = time.perf_counter() - start_time
+
+    return {
+        "url": repo_url,
+        "metric": metric_name,
+        "wall_time": round(wall_time, 4),
+        "requests": server.request_count - request_count,
+        "misses": server.miss_count - miss_count,
+        "peak_memory": max(tracemalloc.get_traced_memory()[1] - memory_before, 0),
+        "error": error
+    }
+
+
+# Return (url, metric, baseline requests, requests) of the metrics making more requests than their baseline.
+def get_regressions(results, baseline):
+    regressions = []
+    for result in results:
+        expected = baseline.get(result["url"], {}).get(result["metric"])
+        if expected is not None and result["requests"] > expected:
+            regressions.append((result["url"], result["metric"], expected, result["requests"]))
+
+    return regressions
+
+
+# Return (url, metric, error) of the metrics failing that did not fail when the archive was recorded.
+def get_new_errors(results, record_errors):
+    return [(result["url"], result["metric"], result["error"]) for result in results
+            if result["error"] is not None and record_errors.get(result["url"], {}).get(result["metric"]) is None]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark every metric against recorded traffic.")
+    parser.add_argument("repos", nargs="?", default=os.path.join(BENCHMARKS_PATH, "repos.txt"))
+    parser.add_argument("--archive", default=os.path.join(BENCHMARKS_PATH, "fixtures", "replay.jsonl.gz"))
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every replayed response")
+    parser.add_argument("--rate-limit", type=int, default=5000, help="GitHub rate limit of the replay server")
+    parser.add_argument("--baseline", default=os.path.join(BENCHMARKS_PATH, "baseline.json"),
+                        help="request counts per repository and metric")
+    parser.add_argument("--update-baseline", action="store_true", help="write the request counts to the baseline")
+    parser.add_argument("--metrics", nargs="*", help="metrics to run (default: all of PARAMS)")
+    parser.add_argument("--output", help="JSON file the results are written to")
+    args = parser.parse_args()
+
+    repos_file = os.path.abspath(args.repos)
+    archive = os.path.abspath(args.archive)
+    record_errors = {}
+    if os.path.exists(get_record_errors_path(archive)):
+        with open(get_record_errors_path(archive), encoding="utf-8") as f:
+            record_errors = json.load(f)
+    server = ReplayServer(load_fixtures(archive), latency=args.latency, rate_limit=args.rate_limit).start()
+    os.environ["OSS_REPLAY_URL"] = server.url
+    os.environ["OSS_HTTP_CACHE"] = "0"
+    os.environ.setdefault("GITHUB_AUTH_TOKEN", "replay-token")
+    os.environ.setdefault("NVD_API_KEY", "replay-key")
+    os.environ["NO_PROXY"] = "127.0.0.1,localhost"
+    # Caches of the estimator are relative to the working directory, keep them out of the tree.
+    work_path = tempfile.mkdtemp(prefix="replay_benchmark_")
+    os.makedirs(os.path.join(work_path, "main"))
+    os.chdir(os.path.join(work_path, "main"))
+
+    from run import get_metric_names
+    from batch import read_repo_urls
+
+    with open(repos_file, encoding="utf-8") as f:
+        repo_urls = read_repo_urls(f)
+    metric_names = args.metrics or get_metric_names()
+
+    tracemalloc.start()
+    results = []
+    print(f"{'repository':<45}{'metric':<34}{'wall s':>9}{'requests':>10}{'misses':>8}{'peak KiB':>10}  error")
+    for repo_url in repo_urls:
+        for metric_name in metric_names:
+            result = measure(server, repo_url, metric_name)
+            results.append(result)
+            print(f"{repo_url[-44:]:<45}{metric_name:<34}{result['wall_time']:>9.3f}{result['requests']:>10}"
+                  f"{result['misses']:>8}{result['peak_memory'] // 1024:>10}  {result['error'] or ''}")
+    tracemalloc.stop()
+    server.stop()
+    shutil.rmtree(work_path, ignore_errors=True)
+
+    print(f"total: {sum(result['wall_time'] for result in results):.2f}s, "
+          f"{sum(result['requests'] for result in results)} requests, "
+          f"{sum(result['misses'] for result in results)} missing from the archive")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    # A metric failing on a missing response makes fewer requests, which the baseline does not catch.
+    failures = [result for result in results if result["misses"] > 0]
+    for result in failures:
+        print(f"MISSING {result['url']} {result['metric']}: {result['misses']} requests not in the archive",
+              file=sys.stderr)
+    new_errors = get_new_errors(results, record_errors)
+    for url, metric_name, error in new_errors:
+        print(f"ERROR {url} {metric_name}: {error}", file=sys.stderr)
+    if failures or new_errors:
+        return 1
+
+    if args.update_baseline:
+        baseline = {}
+        for result in results:
+            baseline.setdefault(result["url"], {})[result["metric"]] = result["requests"]
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        return 0
+
+    if not os.path.exists(args.baseline):
+        return 0
+
+    with open(args.baseline, encoding="utf-8") as f:
+        regressions = get_regressions(results, json.load(f))
+    for url, metric_name, expected, requests in regressions:
+        print(f"REGRESSION {url} {metric_name}: {requests} requests, baseline {expected}", file=sys.stderr)
+
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,221 @@
+"""
+
+Batch scoring of a portfolio of repositories.
+
+Repositories are read from a file (or stdin) one url per line and scored by a
+pool of worker processes. Each finished scorecard is appended to a JSON lines
+results file right away, so an interrupted run resumes by skipping the
+repositories already recorded for its run ID. Records are also added to the
+results store for querying. In incremental mode, metrics
+whose inputs did not change since the latest scorecard of an earlier run are
+copied from it instead of being computed again. Each record carries the time,
+requests and rate limit points spent on each metric, and their totals over
+the run can be written as Prometheus counters.
+
+Usage: python batch.py repos.txt --run-id 2022-05-01 --workers 8 --incremental --metrics-file oss.prom
+
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import datetime
+import concurrent.futures.process
+
+from constants import RESULTS_PATH
+from run import PARAMS, get_metric_names, score_repository
+from results_store import get_results_store
+from instrumentation import Collector, collect, format_prometheus
+
+OK_STATUS = "ok"
+FAILED_STATUS = "failed"
+
+
+def read_repo_urls(source):
+    repo_urls = []
+    seen = set()
+    for line in source:
+        repo_url = line.strip()
+        if not repo_url or repo_url.startswith("#") or repo_url in seen:
+            continue
+        seen.add(repo_url)
+        repo_urls.append(repo_url)
+
+    return repo_urls
+
+
+# Return records of the run already in the results file, keyed by repository url.
+def read_completed(results_file, run_id):
+    completed = {}
+    if not os.path.exists(results_file):
+        return completed
+
+    with open(results_file, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # A line cut short by an interrupted run.
+                continue
+
+            if record.get("run_id") == run_id:
+                completed[record["url"]] = record
+
+    return completed
+
+
+# Return the latest successful record of each repository from runs other than run_id.
+def read_latest(results_file, run_id):
+    latest = {}
+    if not os.path.exists(results_file):
+        return latest
+
+    with open(results_file, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+
+            if record.get("run_id") != run_id and record.get("status") == OK_STATUS:
+                latest[record["url"]] = record
+
+    return latest
+
+
+def get_failed_record(repo_url, run_id, error):
+    return {
+        "run_id": run_id,
+        "url": repo_url,
+        "status": FAILED_STATUS,
+        "error": f"{type(error).__name__}: {error}",
+        "elapsed": 0,
+        "finished_at": datetime.datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "instrumentation": {}
+    }
+
+
+# Score one repository in a worker process, failures are returned as records too.
+def score(repo_url, run_id, metric_names, previous=None, fingerprint=False):
+    start_time = time.time()
+    record = {
+        "run_id": run_id,
+        "url": repo_url,
+        "status": OK_STATUS
+    }
+    with collect() as collector:
+        try:
+            record["scorecard"], record["errors"], record["fingerprints"], record["reused"] = score_repository(
+                repo_url, metric_names, previous, fingerprint)
+        except Exception as e:
+            # URLException, PageOpenException, NVDQueryException or a GitHub error, the batch goes on.
+            record["status"] = FAILED_STATUS
+            record["error"] = f"{type(e).__name__}: {e}"
+
+    record["elapsed"] = round(time.time() - start_time, 2)
+    record["finished_at"] = datetime.datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%SZ")
+    record["instrumentation"] = collector.summary()
+    return record
+
+
+def append_record(results, record):
+    results.write(json.dumps(record, default=str) + "\n")
+    results.flush()
+    os.fsync(results.fileno())
+
+
+# Replace the Prometheus counters file at once, for the textfile collector of node_exporter.
+def write_metrics_file(metrics_file, totals):
+    temp_file = metrics_file + ".tmp"
+    with open(temp_file, "w", encoding="utf-8") as f:
+        f.write(format_prometheus(totals.summary()))
+    os.replace(temp_file, metrics_file)
+
+
+def run_batch(repo_urls, run_id, results_file, metric_names, workers, retry_failed=False, incremental=False,
+              store=None, metrics_file=None):
+    completed = read_completed(results_file, run_id)
+    latest = read_latest(results_file, run_id) if incremental else {}
+    pending = []
+    for repo_url in repo_urls:
+        record = completed.get(repo_url)
+        if record and (record["status"] == OK_STATUS or not retry_failed):
+            continue
+        pending.append(repo_url)
+
+    print(f"run {run_id}: {len(repo_urls) - len(pending)} repositories done, {len(pending)} to score",
+          file=sys.stderr)
+
+    directory = os.path.dirname(results_file)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    failed_count = 0
+    done_count = 0
+    totals = Collector()
+    remaining = pending
+    with open(results_file, "a", encoding="utf-8") as results:
+        while remaining:
+            # A worker dying (out of memory, crash in a parser) breaks the pool and every unfinished future. The
+            # first repository reported broken is recorded as failed, the others are scored again in a new pool.
+            broken = False
+            with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+                # Incremental runs record fingerprints for the next one, the other runs skip their requests.
+                futures = {executor.submit(score, repo_url, run_id, metric_names, latest.get(repo_url), incremental):
+                           repo_url for repo_url in remaining}
+                remaining = []
+                for future in concurrent.futures.as_completed(futures):
+                    try:
+                        record = future.result()
+                    except concurrent.futures.process.BrokenProcessPool as e:
+                        if broken:
+                            remaining.append(futures[future])
+                            continue
+                        broken = True
+                        record = get_failed_record(futures[future], run_id, e)
+
+                    append_record(results, record)
+                    if store is not None:
+                        store.add_record(record)
+                    if metrics_file:
+                        totals.merge(record["instrumentation"])
+                        write_metrics_file(metrics_file, totals)
+                    if record["status"] != OK_STATUS:
+                        failed_count += 1
+                    done_count += 1
+                    print(f"[{done_count}/{len(pending)}] {record['url']}: {record['status']}", file=sys.stderr)
+
+    return len(pending), failed_count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score a list of repositories.")
+    parser.add_argument("repos", help="file with one repository url per line, - for stdin")
+    parser.add_argument("--run-id", default=datetime.date.today().isoformat(),
+                        help="repositories already recorded for this run ID are skipped (default: today)")
+    parser.add_argument("--output", default=os.path.join(RESULTS_PATH, "scorecards.jsonl"),
+                        help="JSON lines file the scorecards are appended to")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="number of worker processes")
+    parser.add_argument("--params", nargs="*", help="PARAMS categories to calculate (default: all)")
+    parser.add_argument("--retry-failed", action="store_true", help="score repositories that failed again")
+    parser.add_argument("--incremental", action="store_true",
+                        help="reuse metrics whose inputs are unchanged since the latest earlier run")
+    parser.add_argument("--metrics-file", help="file the Prometheus counters of the run are written to")
+    args = parser.parse_args()
+
+    if args.repos == "-":
+        repo_urls = read_repo_urls(sys.stdin)
+    else:
+        with open(args.repos, encoding="utf-8") as f:
+            repo_urls = read_repo_urls(f)
+
+    scored_count, failed_count = run_batch(repo_urls, args.run_id, args.output, get_metric_names(args.params),
+                                           args.workers, args.retry_failed, args.incremental,
+                                           get_results_store(PARAMS), args.metrics_file)
+    print(f"run {args.run_id}: {scored_count} repositories scored, {failed_count} failed", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
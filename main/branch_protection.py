@@ -0,0 +1,185 @@
+"""
+
+Protection of the branches that matter (default branch and release targets),
+read with a single GraphQL query instead of one branch and one protection
+request per branch.
+
+The branch protection rules of a repository are only visible to its admins.
+The same query also reads the refUpdateRule of each branch, the rule that
+applies to pushes of the viewer, which any reader can see, and the
+protection is taken from it when the rules are not visible.
+
+"""
+
+import re
+import collections
+
+from exceptions import GraphQLException
+
+# Compact record of the protection of a branch, None stands for an unprotected branch.
+# requires_strict_status_checks is None when read from a refUpdateRule, which does not expose it.
+BranchProtection = collections.namedtuple("BranchProtection", [
+    "branch", "pattern", "allows_deletions", "allows_force_pushes", "required_approving_review_count",
+    "requires_code_owner_reviews", "requires_linear_history", "requires_strict_status_checks",
+    "status_check_contexts"
+])
+
+MAX_MATCHING_REFS = 100
+
+_BRANCH_PROTECTION_RULES_ = """
+    branchProtectionRules(first:100, after:$cursor) {
+      pageInfo { hasNextPage endCursor }
+      nodes {
+        pattern
+        allowsDeletions
+        allowsForcePushes
+        requiresApprovingReviews
+        requiredApprovingReviewCount
+        requiresCodeOwnerReviews
+        requiresLinearHistory
+        requiresStrictStatusChecks
+        requiredStatusCheckContexts
+        matchingRefs(first:$refs) {
+          totalCount
+          nodes { name }
+        }
+      }
+    }
+"""
+
+_BRANCH_PROTECTION_RULES_QUERY_ = """
+query($owner:String!, $name:String!, $refs:Int!, $cursor:String) {
+  repository(owner:$owner, name:$name) {%s  }
+}
+""" % _BRANCH_PROTECTION_RULES_
+
+_REF_UPDATE_RULE_ = """
+    branch%d: ref(qualifiedName:$branch%d) {
+      name
+      refUpdateRule {
+        pattern
+        allowsDeletions
+        allowsForcePushes
+        requiredApprovingReviewCount
+        requiresCodeOwnerReviews
+        requiresLinearHistory
+        requiredStatusCheckContexts
+      }
+    }
+"""
+
+
+# Query of the first page of rules and of the branches, which are aliased branch0, branch1...
+def _get_branches_query_(branch_count):
+    declarations = "".join(f", $branch{i}:String!" for i in range(branch_count))
+    refs = "".join(_REF_UPDATE_RULE_ % (i, i) for i in range(branch_count))
+    return ("query($owner:String!, $name:String!, $refs:Int!, $cursor:String%s) {\n"
+            "  repository(owner:$owner, name:$name) {%s%s  }\n}\n") % (declarations, _BRANCH_PROTECTION_RULES_, refs)
+
+
+# Translate a rule pattern, fnmatch with * and ? not matching "/" and ** matching anything, like GitHub does.
+def _compile_pattern_(pattern):
+    regex = ""
+    for token in re.findall(r"\*\*|\*|\?|\[[^\]]*\]|[^*?\[]+", pattern):
+        if token == "**":
+            regex += ".*"
+        elif token == "*":
+            regex += "[^/]*"
+        elif token == "?":
+            regex += "[^/]"
+        elif token.startswith("["):
+            regex += "[^" + token[2:] if token.startswith("[!") else token
+        else:
+            regex += re.escape(token)
+
+    return re.compile(regex + r"\Z")
+
+
+class _Rule_:
+
+    def __init__(self, node):
+        self.node = node
+        self.pattern = node["pattern"]
+        matching_refs = node.get("matchingRefs") or {}
+        names = [ref["name"] for ref in matching_refs.get("nodes") or []]
+        # Rules matching more refs than fetched are matched by their pattern.
+        self.matching_refs = set(names) if matching_refs.get("totalCount", 0) <= len(names) else None
+        self._regex = None
+
+    def matches(self, branch):
+        if self.matching_refs is not None:
+            return branch in self.matching_refs
+        if self._regex is None:
+            self._regex = _compile_pattern_(self.pattern)
+
+        return self._regex.match(branch) is not None
+
+    def get_protection(self, branch):
+        node = self.node
+        review_count = (node.get("requiredApprovingReviewCount") or 0) if node.get("requiresApprovingReviews") else 0
+        return BranchProtection(branch, self.pattern, bool(node.get("allowsDeletions")),
+                                bool(node.get("allowsForcePushes")), review_count,
+                                bool(node.get("requiresCodeOwnerReviews")), bool(node.get("requiresLinearHistory")),
+                                bool(node.get("requiresStrictStatusChecks")),
+                                tuple(node.get("requiredStatusCheckContexts") or ()))
+
+
+def _get_update_rule_protection_(branch, rule):
+    return BranchProtection(branch, rule.get("pattern"), bool(rule.get("allowsDeletions")),
+                            bool(rule.get("allowsForcePushes")), rule.get("requiredApprovingReviewCount") or 0,
+                            bool(rule.get("requiresCodeOwnerReviews")), bool(rule.get("requiresLinearHistory")), None,
+                            tuple(rule.get("requiredStatusCheckContexts") or ()))
+
+
+# Return the repository of a query result, raise GraphQLException when one of fields can not be read.
+def _get_repository_(result, fields):
+    repository = (result.get("data") or {}).get("repository") or {}
+    if any(field not in repository for field in fields):
+        raise GraphQLException(result.get("errors") or f"{', '.join(fields)} missing from the result")
+
+    return repository
+
+
+# Return branch -> BranchProtection of the existing branches, None for the ones not protected.
+# Raise GraphQLException when the branches can not be read.
+def get_branch_protections(full_name, branch_names, request_graphql):
+    owner, name = full_name.split("/")
+    branch_names = list(dict.fromkeys(branch_names))
+    variables = {"owner": owner, "name": name, "refs": MAX_MATCHING_REFS, "cursor": None}
+    variables.update((f"branch{i}", f"refs/heads/{branch}") for i, branch in enumerate(branch_names))
+    result = request_graphql(_get_branches_query_(len(branch_names)), variables)
+    repository = _get_repository_(result, [f"branch{i}" for i in range(len(branch_names))])
+
+    # Branches which do not exist (deleted release branches) are left out.
+    refs = {branch: repository[f"branch{i}"] for i, branch in enumerate(branch_names)
+            if repository[f"branch{i}"] is not None}
+
+    # Rules are only readable by admins, refUpdateRule of the branches stands for them otherwise.
+    rules = []
+    connection = repository.get("branchProtectionRules")
+    while connection is not None:
+        rules.extend(_Rule_(node) for node in connection["nodes"])
+        if not connection["pageInfo"]["hasNextPage"]:
+            break
+        variables = {"owner": owner, "name": name, "refs": MAX_MATCHING_REFS,
+                     "cursor": connection["pageInfo"]["endCursor"]}
+        page = request_graphql(_BRANCH_PROTECTION_RULES_QUERY_, variables)
+        connection = _get_repository_(page, ["branchProtectionRules"])["branchProtectionRules"]
+        if connection is None:
+            raise GraphQLException(page.get("errors") or "branchProtectionRules missing from the result")
+
+    protections = {}
+    for branch, ref in refs.items():
+        if rules:
+            # A rule naming the branch exactly takes precedence over wildcard rules, as on GitHub.
+            matching = [rule for rule in rules if rule.matches(branch)]
+            exact = [rule for rule in matching if rule.pattern == branch]
+            rule = (exact or matching or [None])[0]
+            protections[branch] = rule.get_protection(branch) if rule else None
+        elif ref.get("refUpdateRule") is not None:
+            protections[branch] = _get_update_rule_protection_(branch, ref["refUpdateRule"])
+        else:
+            # No rule applies to the branch, readable without the rules (errors on them do not matter).
+            protections[branch] = None
+
+    return protections
@@ -4,6 +4,7 @@ Constant Variables used in security score calculation.
 
 """
 
+import os
 import re
 
 FAIL_RETRIES = 7
@@ -21,7 +22,43 @@ HTTP_REQUEST_HEADER = {
                           "Chrome/99.0.4844.74 Safari/537.36 "
         }
 
-TEMP_REPOSITORY_PATH = "..\\temp_repository"
+# HTTP transport settings.
+HTTP_TIMEOUT = 30
+HTTP_POOL_SIZE = 32
+HTTP_HOST_CONCURRENCY = 8
+# Callables of run_all running at once, the others wait for their turn.
+RUN_ALL_CONCURRENCY = 32
+HTTP_HOST_CONCURRENCY_LIMITS = {
+    "services.nvd.nist.gov": 2,
+    "cve.mitre.org": 4
+}
+
+# GitHub rate limits per token, and the budget left untouched on each token.
+GITHUB_RATE_LIMITS = {
+    "core": 5000,
+    "search": 30,
+    "graphql": 5000
+}
+GITHUB_RATE_LIMIT_RESERVE = 50
+
+TEMP_REPOSITORY_PATH = os.path.join("..", "temp_repository")
+
+# Persistent caches shared across runs.
+CACHE_PATH = os.path.join("..", "cache")
+WORKFLOW_CACHE_PATH = os.path.join(CACHE_PATH, "workflows")
+NVD_MIRROR_PATH = os.path.join(CACHE_PATH, "nvd.sqlite3")
+CVE_INDEX_PATH = os.path.join(CACHE_PATH, "cve_index.sqlite3")
+USER_CACHE_PATH = os.path.join(CACHE_PATH, "users.sqlite3")
+USER_PROFILE_TTL = 7 * 24 * 3600
+DEPENDENCY_CACHE_PATH = os.path.join(CACHE_PATH, "dependencies.sqlite3")
+DEPENDENCY_VULNERABILITY_TTL = 7 * 24 * 3600
+DEPENDENCY_RESOLVE_CONCURRENCY = 8
+HTTP_CACHE_PATH = os.path.join(CACHE_PATH, "http")
+HTTP_CACHE_MAX_SIZE = 1024 * 1024 * 1024
+
+# Scorecards of batch runs.
+RESULTS_PATH = os.path.join("..", "results")
+RESULTS_STORE_PATH = os.path.join(RESULTS_PATH, "scorecards.sqlite3")
 
 # Regex to match dependents count
 DEPENDENTS_REGEX = re.compile(b'.*[^0-9,]([0-9,]+).*commit result', re.DOTALL)
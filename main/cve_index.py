@@ -0,0 +1,151 @@
+"""
+
+Inverted index from GitHub repositories to CVE records, built from the CVE list.
+
+The index is built from a local copy of the CVE list (allitems.csv from
+cve.mitre.org), so CVE numbers of a repository and the classified references
+of a CVE are looked up instead of scraped from cvekey.cgi and cvename.cgi.
+
+Usage: python cve_index.py <allitems.csv>
+
+"""
+
+import os
+import re
+import sys
+import csv
+import sqlite3
+import datetime
+import threading
+import collections
+
+from constants import CVE_INDEX_PATH
+from references import classify_reference, get_reference_repository
+
+_SCHEMA_ = """
+create table if not exists cve (
+    cve_id text primary key,
+    record_date text
+);
+create table if not exists cve_reference (
+    cve_id text not null,
+    url text not null,
+    repository text,
+    reference_type text
+);
+create index if not exists cve_reference_cve_id on cve_reference (cve_id);
+create index if not exists cve_reference_repository on cve_reference (repository, reference_type);
+create table if not exists meta (
+    key text primary key,
+    value text
+);
+"""
+
+# references is a tuple of reference urls, record_date is None when unknown.
+CveRecord = collections.namedtuple("CveRecord", ["record_date", "references"])
+
+_CVE_ID_REGEX_ = re.compile(r"^CVE-[0-9]{4}-[0-9]{4,}$")
+_URL_REGEX_ = re.compile(r"URL:(\S+)")
+_PHASE_DATE_REGEX_ = re.compile(r"\(([0-9]{8})\)")
+
+
+class CveReferenceIndex:
+
+    def __init__(self, path=CVE_INDEX_PATH):
+        self._path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("pragma journal_mode = wal")
+        self._connection.executescript(_SCHEMA_)
+
+    def close(self):
+        self._connection.close()
+
+    def _query_(self, sql, params=()):
+        with self._lock:
+            return self._connection.execute(sql, params).fetchall()
+
+    # Version of the index, it changes on every rebuild, None before the first one.
+    @property
+    def version(self):
+        rows = self._query_("select value from meta where key = 'version'")
+        return rows[0][0] if rows else None
+
+    def __contains__(self, cve_number):
+        return bool(self._query_("select 1 from cve where cve_id = ?", (cve_number,)))
+
+    # Return CVE IDs with a reference to the GitHub repository.
+    def get_cve_numbers(self, full_name):
+        rows = self._query_("select distinct cve_id from cve_reference where repository = ? order by cve_id",
+                            (full_name.lower(),))
+        return [row[0] for row in rows]
+
+    # Return the record date of the CVE, or None if it is not indexed.
+    def get_record_date(self, cve_number):
+        rows = self._query_("select record_date from cve where cve_id = ?", (cve_number,))
+        if not rows or not rows[0][0]:
+            return None
+
+        return datetime.datetime.strptime(rows[0][0], "%Y%m%d")
+
+    # Return (url, reference type) of every reference of the CVE.
+    def get_references(self, cve_number):
+        return self._query_("select url, reference_type from cve_reference where cve_id = ?", (cve_number,))
+
+    # Return the CveRecord of the CVE, or None if it is not indexed.
+    def get_record(self, cve_number):
+        if cve_number not in self:
+            return None
+
+        references = tuple(url for url, _ in self.get_references(cve_number))
+        return CveRecord(self.get_record_date(cve_number), references)
+
+    # Rebuild the index from allitems.csv of the CVE list.
+    def build(self, csv_path):
+        cve_rows = []
+        reference_rows = []
+        with open(csv_path, encoding="latin-1", newline="") as f:
+            for row in csv.reader(f):
+                # Skip the preamble and header lines of the dump.
+                if len(row) < 5 or not _CVE_ID_REGEX_.match(row[0]):
+                    continue
+
+                cve_id = row[0]
+                match = _PHASE_DATE_REGEX_.search(row[4])
+                cve_rows.append((cve_id, match.group(1) if match else None))
+                for url in _URL_REGEX_.findall(row[3]):
+                    reference_rows.append((cve_id, url, get_reference_repository(url), classify_reference(url)))
+
+        version = datetime.datetime.utcnow().strftime("%Y%m%d%H%M%S")
+        with self._lock, self._connection:
+            self._connection.execute("delete from cve")
+            self._connection.execute("delete from cve_reference")
+            self._connection.executemany("insert into cve values (?, ?)", cve_rows)
+            self._connection.executemany("insert into cve_reference values (?, ?, ?, ?)", reference_rows)
+            self._connection.execute("insert or replace into meta values ('version', ?)", (version,))
+
+        return len(cve_rows)
+
+
+_CVE_INDEX = None
+
+
+# Return the CVE reference index, or None if it has not been built.
+def get_cve_index():
+    global _CVE_INDEX
+    if _CVE_INDEX is None:
+        path = os.getenv("CVE_INDEX_PATH", CVE_INDEX_PATH)
+        if not os.path.exists(path):
+            return None
+        _CVE_INDEX = CveReferenceIndex(path)
+
+    return _CVE_INDEX
+
+
+if __name__ == "__main__":
+    index = CveReferenceIndex(os.getenv("CVE_INDEX_PATH", CVE_INDEX_PATH))
+    print(f"{index.build(sys.argv[1])} CVEs indexed")
+    index.close()
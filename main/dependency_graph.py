@@ -0,0 +1,131 @@
+"""
+
+Vulnerability counts of dependencies, resolved once for a whole portfolio.
+
+A popular library is a dependency of most repositories of a batch, so the
+vulnerability count of each dependency is memoized in the process, and kept
+in SQLite with the time it was resolved so that the worker processes of a
+batch and later runs share it until it is older than the TTL. Dependencies
+missing from both are resolved concurrently, with a bounded number of them
+in flight at once.
+
+"""
+
+import os
+import time
+import sqlite3
+import threading
+import contextvars
+import concurrent.futures
+
+from constants import DEPENDENCY_CACHE_PATH, DEPENDENCY_VULNERABILITY_TTL, DEPENDENCY_RESOLVE_CONCURRENCY
+
+_SCHEMA_ = """
+create table if not exists dependency_vulnerability (
+    dependency text primary key,
+    vulnerability_count integer,
+    resolved_at real not null
+);
+"""
+
+
+class DependencyGraph:
+
+    def __init__(self, path=DEPENDENCY_CACHE_PATH, ttl=DEPENDENCY_VULNERABILITY_TTL,
+                 concurrency=DEPENDENCY_RESOLVE_CONCURRENCY):
+        self._ttl = ttl
+        self._concurrency = concurrency
+        self._lock = threading.Lock()
+        # dependency -> (vulnerability count, resolved at), shared by all repositories of the process.
+        self._memo = {}
+        # dependency -> future of a resolution in flight, so concurrent repositories wait for it.
+        self._pending = {}
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Worker processes of a batch share the file, so wait for their writes.
+        self._connection = sqlite3.connect(path, timeout=60, check_same_thread=False)
+        self._connection.execute("pragma journal_mode = wal")
+        self._connection.executescript(_SCHEMA_)
+
+    def close(self):
+        self._connection.close()
+
+    def _read_(self, dependencies):
+        counts = {}
+        min_resolved_at = time.time() - self._ttl
+        for i in range(0, len(dependencies), 500):
+            chunk = dependencies[i: i + 500]
+            placeholders = ",".join("?" * len(chunk))
+            rows = self._connection.execute(f"select dependency, vulnerability_count, resolved_at from "
+                                            f"dependency_vulnerability where resolved_at >= ? and "
+                                            f"dependency in ({placeholders})", [min_resolved_at] + chunk)
+            for dependency, vulnerability_count, resolved_at in rows:
+                counts[dependency] = (vulnerability_count, resolved_at)
+
+        return counts
+
+    def _write_(self, dependency, vulnerability_count, resolved_at):
+        with self._lock, self._connection:
+            self._connection.execute("insert or replace into dependency_vulnerability values (?, ?, ?)",
+                                     (dependency, vulnerability_count, resolved_at))
+            self._memo[dependency] = (vulnerability_count, resolved_at)
+
+    def _resolve_(self, dependency, resolve):
+        vulnerability_count = resolve(dependency)
+        self._write_(dependency, vulnerability_count, time.time())
+        return vulnerability_count
+
+    # Return dependency -> vulnerability count, resolve(dependency) is called concurrently for unknown ones.
+    def get_vulnerability_counts(self, dependencies, resolve):
+        dependencies = list(dict.fromkeys(dependencies))
+        min_resolved_at = time.time() - self._ttl
+        counts = {}
+        with self._lock:
+            for dependency in dependencies:
+                memo = self._memo.get(dependency)
+                if memo and memo[1] >= min_resolved_at:
+                    counts[dependency] = memo[0]
+
+            missing = [dependency for dependency in dependencies if dependency not in counts]
+            for dependency, memo in self._read_(missing).items():
+                self._memo[dependency] = memo
+                counts[dependency] = memo[0]
+
+            # Start resolving dependencies nobody is resolving yet, and wait for the others too.
+            futures = {}
+            executor = None
+            for dependency in dependencies:
+                if dependency in counts:
+                    continue
+                future = self._pending.get(dependency)
+                if future is None:
+                    if executor is None:
+                        executor = concurrent.futures.ThreadPoolExecutor(max_workers=self._concurrency)
+                    future = executor.submit(contextvars.copy_context().run, self._resolve_, dependency, resolve)
+                    self._pending[dependency] = future
+                futures[dependency] = future
+
+        try:
+            for dependency, future in futures.items():
+                counts[dependency] = future.result()
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=True)
+            with self._lock:
+                for dependency, future in futures.items():
+                    if self._pending.get(dependency) is future:
+                        del self._pending[dependency]
+
+        return {dependency: counts[dependency] for dependency in dependencies}
+
+
+_DEPENDENCY_GRAPH = None
+
+
+def get_dependency_graph():
+    global _DEPENDENCY_GRAPH
+    if _DEPENDENCY_GRAPH is None:
+        _DEPENDENCY_GRAPH = DependencyGraph(os.getenv("DEPENDENCY_CACHE_PATH", DEPENDENCY_CACHE_PATH))
+
+    return _DEPENDENCY_GRAPH
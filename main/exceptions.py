@@ -1,7 +1,7 @@
 class PageOpenException(Exception):
     def __init__(self, url, status_code):
         self.url = url
-        self.status_code
+        self.status_code = status_code
 
     def __str__(self):
         return f"URL {self.url} did NOT open properly. Status code: {str(self.status_code)}"
@@ -17,5 +17,22 @@ class NumberExceedCapException(Exception):
         return "Very large number."
 
 
+class GraphQLException(Exception):
+    def __init__(self, errors):
+        self.errors = errors
+
+    def __str__(self):
+        return f"GraphQL query failed: {self.errors}"
+
+
+class GitException(Exception):
+    def __init__(self, command, message):
+        self.command = command
+        self.message = message
+
+    def __str__(self):
+        return f"git {self.command} failed: {self.message}"
+
+
 class URLException(Exception):
     pass
@@ -0,0 +1,108 @@
+"""
+
+Immutable snapshot of a repository git tree, pinned to a single commit.
+
+"""
+
+import collections
+
+
+class TreeEntry(collections.namedtuple("TreeEntry", ["path", "type", "sha", "size"])):
+    __slots__ = ()
+
+    @property
+    def name(self):
+        return self.path.split("/")[-1]
+
+    @property
+    def directory(self):
+        # Directory of the entry with a trailing slash, "" for the root.
+        directory, _, _ = self.path.rpartition("/")
+        return directory + "/" if directory else ""
+
+    @property
+    def suffix(self):
+        name = self.name
+        if "." not in name:
+            return ""
+        return name.rsplit(".", 1)[1]
+
+
+class GitTreeSnapshot:
+    __slots__ = ("_sha", "_entries", "_truncated", "_positions", "_by_path", "_by_basename", "_by_directory",
+                 "_by_suffix")
+
+    def __init__(self, sha, entries, truncated=False):
+        entries = tuple(entries)
+        by_path = {}
+        by_basename = {}
+        by_directory = {}
+        by_suffix = {}
+        for entry in entries:
+            # All lookups are case-insensitive, paths keep their original case.
+            by_path[entry.path.lower()] = entry
+            by_basename.setdefault(entry.name.lower(), []).append(entry)
+            by_directory.setdefault(entry.directory.lower(), []).append(entry)
+            suffix = entry.suffix.lower()
+            if suffix:
+                by_suffix.setdefault(suffix, []).append(entry)
+
+        object.__setattr__(self, "_sha", sha)
+        object.__setattr__(self, "_entries", entries)
+        object.__setattr__(self, "_truncated", truncated)
+        object.__setattr__(self, "_positions", {entry: i for i, entry in enumerate(entries)})
+        object.__setattr__(self, "_by_path", by_path)
+        object.__setattr__(self, "_by_basename", {k: tuple(v) for k, v in by_basename.items()})
+        object.__setattr__(self, "_by_directory", {k: tuple(v) for k, v in by_directory.items()})
+        object.__setattr__(self, "_by_suffix", {k: tuple(v) for k, v in by_suffix.items()})
+
+    def __setattr__(self, key, value):
+        raise AttributeError("GitTreeSnapshot is immutable.")
+
+    @classmethod
+    def from_git_tree(cls, sha, git_tree):
+        # Build a snapshot from a PyGithub GitTree fetched with recursive=True.
+        entries = [TreeEntry(element.path, element.type, element.sha, element.size) for element in git_tree.tree]
+        return cls(sha, entries, truncated=bool(getattr(git_tree, "raw_data", {}).get("truncated")))
+
+    @property
+    def sha(self):
+        return self._sha
+
+    @property
+    def truncated(self):
+        return self._truncated
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __iter__(self):
+        return iter(self._entries)
+
+    def __contains__(self, path):
+        return path.lower() in self._by_path
+
+    def blobs(self):
+        return tuple(entry for entry in self._entries if entry.type == "blob")
+
+    def get(self, path):
+        return self._by_path.get(path.lower())
+
+    def by_basename(self, *names):
+        return self._lookup_(self._by_basename, names)
+
+    def by_directory(self, *directories):
+        return self._lookup_(self._by_directory, directories)
+
+    def by_suffix(self, *suffixes):
+        return self._lookup_(self._by_suffix, suffixes)
+
+    def _lookup_(self, index, keys):
+        if len(keys) == 1:
+            return index.get(keys[0].lower(), ())
+
+        # Merge several buckets back into tree order.
+        result = set()
+        for key in keys:
+            result.update(index.get(key.lower(), ()))
+        return tuple(sorted(result, key=self._positions.__getitem__))
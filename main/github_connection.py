@@ -0,0 +1,95 @@
+"""
+
+PyGithub connection classes sending requests through the shared transport.
+
+Once installed, REST calls made by PyGithub share the pooled connections and
+per-host limits of the transport, and their GET requests are revalidated
+against the HTTP cache like the ones made by request_github. With a token
+pool, each request to the GitHub API takes the token with the most budget
+left in its bucket, whichever token the Github client was created with.
+
+"""
+
+import github
+
+from transport import get_transport
+from token_pool import CORE_BUCKET, SEARCH_BUCKET, GRAPHQL_BUCKET
+
+
+class _TransportResponse:
+
+    def __init__(self, response):
+        self._response = response
+
+    @property
+    def status(self):
+        return self._response.status_code
+
+    def getheaders(self):
+        return list(self._response.headers.items())
+
+    def read(self):
+        return self._response.text
+
+
+class HttpsTransportConnection:
+
+    scheme = "https"
+    default_port = 443
+
+    # PyGithub also passes timeout, retry, pool_size and verify, the transport has its own.
+    def __init__(self, host, port=None, **kwargs):
+        self.host = host
+        self.port = port
+        self._response = None
+
+    def request(self, verb, url, input=None, headers=None):
+        netloc = self.host
+        if self.port and int(self.port) != self.default_port:
+            netloc = f"{self.host}:{self.port}"
+        token_state = None
+        if _TOKEN_POOL is not None and self.host == "api.github.com":
+            token_state = _TOKEN_POOL.acquire(_get_bucket_(url))
+            headers = dict(headers or {})
+            headers["Authorization"] = f"token {token_state.token}"
+
+        self._response = get_transport().request(verb, f"{self.scheme}://{netloc}{url}", headers=headers,
+                                                 data=input, cache=verb.upper() == "GET")
+        if token_state is not None:
+            _TOKEN_POOL.update(token_state.token, self._response.headers)
+
+    def getresponse(self):
+        return _TransportResponse(self._response)
+
+    def close(self):
+        self._response = None
+
+
+class HttpTransportConnection(HttpsTransportConnection):
+
+    scheme = "http"
+    default_port = 80
+
+
+def _get_bucket_(url):
+    if url.startswith("/search/"):
+        return SEARCH_BUCKET
+    if url.startswith("/graphql"):
+        return GRAPHQL_BUCKET
+
+    return CORE_BUCKET
+
+
+_INSTALLED = False
+_TOKEN_POOL = None
+
+
+# Route PyGithub through the transport, Github objects created before this keep their own connections.
+# Requests to the GitHub API are authorized with a token of token_pool when it is given.
+def install_connection_classes(token_pool=None):
+    global _INSTALLED, _TOKEN_POOL
+    if token_pool is not None:
+        _TOKEN_POOL = token_pool
+    if not _INSTALLED:
+        github.Requester.Requester.injectConnectionClasses(HttpTransportConnection, HttpsTransportConnection)
+        _INSTALLED = True
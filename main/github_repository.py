@@ -7,21 +7,32 @@ A subclass of Repository, the abstract of repository on GitHub.
 import os
 import json
 import time
-import yaml
 import github
 import urllib
 import datetime
-import requests
-from copy import deepcopy
-from bs4 import BeautifulSoup
 from urllib.parse import quote
 
 from constants import *
 from exceptions import *
 from repository import Repository
+from git_tree import GitTreeSnapshot
+from workflow_store import WorkflowStore, is_workflow_file
 from job_matchers import JOB_MATCHERS
-
-
+from transport import get_transport
+from token_pool import TokenPool, CORE_BUCKET, GRAPHQL_BUCKET
+from nvd_store import get_nvd_store
+from cve_index import CveRecord, get_cve_index
+from merge_activity import get_recent_commits
+from branch_protection import get_branch_protections
+from user_cache import UserProfile, get_user_profile_cache
+from dependency_graph import get_dependency_graph
+from github_connection import install_connection_classes
+from local_clone import open_local_clone
+from html_extract import get_html_extractor
+from instrumentation import instrument_properties, select_graphql_cost
+
+
+@instrument_properties
 class GitHubRepository(Repository):
     @property
     def name(self):
@@ -35,6 +46,78 @@ class GitHubRepository(Repository):
     def description(self):
         return self._repo.description
 
+    # Local clone answering tree and file checks, None unless OSS_LOCAL_CLONE=1 or LOCAL_MIRROR_PATH is set.
+    def _get_local_clone_(self):
+        if self._local_clone is None:
+            if os.getenv("OSS_LOCAL_CLONE") != "1" and not os.getenv("LOCAL_MIRROR_PATH"):
+                return None
+            self._local_clone = open_local_clone(self._repo.full_name, self._repo.clone_url,
+                                                 self._repo.default_branch)
+
+        return self._local_clone
+
+    # Release the local clone of the repository, the batch scores repositories one after another in a worker.
+    def close(self):
+        if self._local_clone is not None:
+            self._local_clone.remove()
+            self._local_clone = None
+
+    # Head of the default branch, the tree snapshot is pinned to it so every check sees the same tree.
+    def _get_head_sha_(self):
+        if self._head_sha is None:
+            clone = self._get_local_clone_()
+            if clone is not None:
+                self._head_sha = clone.get_head_sha(f"refs/heads/{self._repo.default_branch}")
+            else:
+                self._head_sha = self._repo.get_branch(self._repo.default_branch).commit.sha
+
+        return self._head_sha
+
+    def _get_tree_snapshot_(self):
+        if self._tree_snapshot is None:
+            head_sha = self._get_head_sha_()
+            clone = self._get_local_clone_()
+            if clone is not None:
+                self._tree_snapshot = clone.get_tree_snapshot(head_sha)
+                return self._tree_snapshot
+
+            git_tree = self._repo.get_git_tree(sha=head_sha, recursive=True)
+            self._tree_snapshot = GitTreeSnapshot.from_git_tree(head_sha, git_tree)
+
+        return self._tree_snapshot
+
+    # ETag of the latest releases, it changes when a release is published, edited or deleted.
+    def _get_release_etag_(self):
+        url = f"https://api.github.com/repos/{self._repo.full_name}/releases"
+        response = request_github("GET", url, params={"per_page": 5})
+        if response.status_code != 200:
+            raise PageOpenException(url, response.status_code)
+
+        return response.headers.get("ETag")
+
+    # Return the text of a blob of the tree snapshot, "" if it can not be read.
+    def _read_text_(self, file):
+        clone = self._get_local_clone_()
+        if clone is not None:
+            return clone.read_text(file.sha)
+
+        return get_text(self._repo.full_name, self._get_tree_snapshot_().sha, file.path)
+
+    def _get_workflow_store_(self):
+        if self._workflow_store is None:
+            tree = self._get_tree_snapshot_()
+            clone = self._get_local_clone_()
+
+            def _fetch_text_(file):
+                if clone is not None:
+                    return clone.read_text(file.sha)
+                return get_file_content(self._repo.full_name, tree.sha, file.path)
+
+            self._workflow_store = WorkflowStore(tree, _fetch_text_)
+            self._workflow_store.load_all()
+
+        return self._workflow_store
+
     def _get_first_commit_time_(self):
 
         def _parse_links_(response):
@@ -66,8 +149,40 @@ class GitHubRepository(Repository):
 
         return None
 
+    def _get_recent_commits_(self):
+        # Recent commits with their pull requests and checks, shared by ci_test, code_review and sast.
+        if self._recent_commits is None:
+            self._recent_commits = get_recent_commits(self._repo.full_name, request_github_graphql)
+
+        return self._recent_commits
+
+    def _get_contributors_(self):
+        # Contributors are listed once and shared by the contributor metrics.
+        if self._contributors is None:
+            self._contributors = list(self._repo.get_contributors())
+
+        return self._contributors
+
+    def _get_top_contributors_(self):
+        # Only the first page is read, unless the full list has already been listed.
+        if self._top_contributors is None:
+            if self._contributors is not None:
+                self._top_contributors = self._contributors[:TOP_CONTRIBUTOR_COUNT]
+            else:
+                self._top_contributors = list(self._repo.get_contributors()[:TOP_CONTRIBUTOR_COUNT])
+
+        return self._top_contributors
+
+    def _get_contributor_profiles_(self, contributors, with_orgs=False):
+        # Profiles come from the cache shared across repositories, only missing or stale ones are fetched.
+        logins = [contributor.login for contributor in contributors]
+        return get_user_profile_cache().get_profiles(logins, fetch_user_profile, with_orgs)
+
     @property
     def created_since(self):
+        if self._created_since is not None:
+            return self._created_since
+
         creation_time = self._repo.created_at
 
         # See if there is existed any commit before this repository creation
@@ -80,7 +195,8 @@ class GitHubRepository(Repository):
                 creation_time = min(creation_time, first_commit_time)
 
         difference = datetime.datetime.utcnow() - creation_time
-        return round(difference.days / 30)
+        self._created_since = round(difference.days / 30)
+        return self._created_since
 
     @property
     def main_language(self):
@@ -100,22 +216,15 @@ class GitHubRepository(Repository):
 
     @property
     def dependency_count(self):
-        if self._dependencies:
+        if self._dependencies is not None:
             return len(self._dependencies)
 
         url = self._repo.html_url + "/network/dependencies"
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) "
-                          "Chrome/99.0.4844.74 Safari/537.36 "
-        }
-        response = requests.get(url=url, headers=headers)
+        response = get_transport().get(url, headers=HTTP_REQUEST_HEADER)
         dependencies = []
         if response.status_code == 200:
-            html = response.text
-            bs = BeautifulSoup(html, "html.parser")
-            result_set = bs.find_all(name="a", attrs={"data-octo-click": "dep_graph_package"})
-            for result in result_set:
-                dependency = result.attrs["href"].split("/", 1)[1]
+            for href in get_html_extractor().get_dependency_hrefs(response.text):
+                dependency = href.split("/", 1)[1]
                 dependencies.append(dependency)
         else:
             raise PageOpenException(url, response.status_code)
@@ -131,27 +240,96 @@ class GitHubRepository(Repository):
                 "keyword": quote(value)
             }
 
+        cve_index = get_cve_index()
+        if cve_index:
+            return cve_index.get_cve_numbers(self._repo.full_name)
+
         vulnerability_cve_numbers = []
         url = "https://cve.mitre.org/cgi-bin/cvekey.cgi"
 
-        response = requests.get(url=url, headers=HTTP_REQUEST_HEADER, params=_pad_params_(self._repo.full_name))
+        response = get_transport().get(url, headers=HTTP_REQUEST_HEADER, params=_pad_params_(self._repo.full_name))
         if response.status_code == 200:
-            html = response.text
-            bs = BeautifulSoup(html, "html.parser")
-            cve_number_regex = re.compile("CVE-[0-9]{4}-[0-9]{4,}")
-            result_set = bs.find_all(name="a", text=cve_number_regex)
-            for result in result_set:
-                cve_number = result.text.strip()
-                vulnerability_cve_numbers.append(cve_number)
+            vulnerability_cve_numbers.extend(get_html_extractor().get_cve_numbers(response.text))
 
         else:
             raise PageOpenException(url, response.status_code)
 
         return vulnerability_cve_numbers
 
+    def _get_cve_records_(self, cve_numbers):
+        # Record date and reference urls of each CVE, shared by the vulnerability metrics.
+        missing_cve_numbers = [cve_number for cve_number in cve_numbers if cve_number not in self._cve_records]
+
+        # Look up the local CVE index first, only CVEs it does not know are scraped from cve.mitre.org.
+        cve_index = get_cve_index()
+        if cve_index and missing_cve_numbers:
+            for cve_number in missing_cve_numbers:
+                record = cve_index.get_record(cve_number)
+                if record:
+                    self._cve_records[cve_number] = record
+            missing_cve_numbers = [cve_number for cve_number in missing_cve_numbers
+                                   if cve_number not in self._cve_records]
+
+        url = "https://cve.mitre.org/cgi-bin/cvename.cgi"
+        requests_ = []
+        for cve_number in missing_cve_numbers:
+            requests_.append({"url": url, "headers": HTTP_REQUEST_HEADER, "params": {"name": cve_number}})
+
+        responses = get_transport().fetch_all(requests_)
+        for cve_number, response in zip(missing_cve_numbers, responses):
+            if response.status_code != 200:
+                raise PageOpenException(url, response.status_code)
+
+            result, references = get_html_extractor().get_cve_record(response.text)
+            record_date = None
+            if result:
+                record_date = datetime.datetime.strptime(result[: 8], "%Y%m%d")
+            self._cve_records[cve_number] = CveRecord(record_date, tuple(references))
+
+        return {cve_number: self._cve_records[cve_number] for cve_number in cve_numbers}
+
+    def _get_cvss_base_scores_(self, cve_numbers):
+        # CVSS v3 base score of each CVE, None for CVEs without one.
+        missing_cve_numbers = [cve_number for cve_number in cve_numbers if cve_number not in self._cvss_base_scores]
+
+        # Answer from the local NVD mirror first, the API is only used for CVEs it does not know yet.
+        nvd_store = get_nvd_store()
+        if nvd_store and missing_cve_numbers:
+            self._cvss_base_scores.update(nvd_store.get_base_scores(missing_cve_numbers))
+            missing_cve_numbers = [cve_number for cve_number in missing_cve_numbers
+                                   if cve_number not in self._cvss_base_scores]
+
+        if missing_cve_numbers:
+            nvd_api_key = os.getenv("NVD_API_KEY")
+            assert nvd_api_key, "NVD_API_KEY needs to be set."
+            requests_ = []
+            for cve_number in missing_cve_numbers:
+                requests_.append({
+                    "url": f"https://services.nvd.nist.gov/rest/json/cve/1.0/{cve_number}",
+                    "params": {
+                        "q": "CVE",
+                        "apiKey": nvd_api_key
+                    }
+                })
+
+            responses = get_transport().fetch_all(requests_)
+            for cve_number, response in zip(missing_cve_numbers, responses):
+                if response.status_code != 200:
+                    raise NVDQueryException
+
+                data = json.loads(response.content)
+                cve_item_impact = data.get("result").get("CVE_Items")[0].get("impact")
+                if "baseMetricV3" in cve_item_impact:
+                    self._cvss_base_scores[cve_number] = cve_item_impact.get("baseMetricV3").get("cvssV3").get(
+                        "baseScore")
+                else:
+                    self._cvss_base_scores[cve_number] = None
+
+        return {cve_number: self._cvss_base_scores[cve_number] for cve_number in cve_numbers}
+
     @property
     def history_vulnerability_count(self):
-        if self._vulnerability_cve_numbers:
+        if self._vulnerability_cve_numbers is not None:
             return len(self._vulnerability_cve_numbers)
 
         try:
@@ -163,67 +341,53 @@ class GitHubRepository(Repository):
 
     @property
     def unfixed_vulnerability_count(self):
-        if self._unfixed_vulnerability_numbers:
+        if self._unfixed_vulnerability_numbers is not None:
             return len(self._unfixed_vulnerability_numbers)
 
         # collecting unfixed cve vulnerability
         unfixed_vulnerability_numbers = []
-        if self._vulnerability_cve_numbers:
+        if self._vulnerability_cve_numbers is not None:
             vulnerability_cve_numbers = self._vulnerability_cve_numbers
         else:
             vulnerability_cve_numbers = self._get_vulnerability_cve_numbers_()
 
-        def _pad_params_(value):
-            return {
-                "name": value
-            }
-
-        url = "https://cve.mitre.org/cgi-bin/cvename.cgi"
+        cve_records = self._get_cve_records_(vulnerability_cve_numbers)
         for cve_number in vulnerability_cve_numbers:
             # see if there is a commit for the CVE
-            response = requests.get(url=url, headers=HTTP_REQUEST_HEADER, params=_pad_params_(cve_number))
-            if response.status_code == 200:
-                html = response.text
-                bs = BeautifulSoup(html, "html.parser")
-                result_set = bs.select("li a[target='_blank']")
-                for result in result_set:
-                    href = result.attrs["href"]
-                    expected_commit_path = f"https://github.com/{self._repo.full_name}/commit"
-                    if expected_commit_path in href:
-                        unfixed_vulnerability_numbers.append(cve_number)
-
-                    expected_issue_path = f"https://github.com/{self._repo.full_name}/issues"
-                    if expected_issue_path in href:
-                        contributors = self._repo.get_contributors()
-                        issue_number = int(href.split("/")[-1].strip())
-                        issue = self._repo.get_issue(issue_number)
-                        state = issue.state
-                        if "closed" in state:
-                            continue
-                        else:
-                            comments = issue.get_comments()
-                            # see if any contributor comment to this issue
-                            flag = False
-                            for comment in comments:
-                                comment_user = comment.user
-                                if comment_user in contributors:
-                                    flag = True
-
-                        if flag:
-                            continue
+            for href in cve_records[cve_number].references:
+                expected_commit_path = f"https://github.com/{self._repo.full_name}/commit"
+                if expected_commit_path in href:
+                    unfixed_vulnerability_numbers.append(cve_number)
 
-                    expected_release_path = f"https://github.com/{self._repo.full_name}/releases"
-                    if expected_release_path in href:
+                expected_issue_path = f"https://github.com/{self._repo.full_name}/issues"
+                if expected_issue_path in href:
+                    contributors = self._get_contributors_()
+                    issue_number = int(href.split("/")[-1].strip())
+                    issue = self._repo.get_issue(issue_number)
+                    state = issue.state
+                    if "closed" in state:
                         continue
-
-                    expected_pull_request_path = f"https://github.com/{self._repo.full_name}/pull"
-                    if expected_pull_request_path in href:
+                    else:
+                        comments = issue.get_comments()
+                        # see if any contributor comment to this issue
+                        flag = False
+                        for comment in comments:
+                            comment_user = comment.user
+                            if comment_user in contributors:
+                                flag = True
+
+                    if flag:
                         continue
 
-                    unfixed_vulnerability_numbers.append(cve_number)
+                expected_release_path = f"https://github.com/{self._repo.full_name}/releases"
+                if expected_release_path in href:
+                    continue
 
-            else:
-                raise PageOpenException(url, response.status_code)
+                expected_pull_request_path = f"https://github.com/{self._repo.full_name}/pull"
+                if expected_pull_request_path in href:
+                    continue
+
+                unfixed_vulnerability_numbers.append(cve_number)
 
         self._unfixed_vulnerability_numbers = unfixed_vulnerability_numbers
 
@@ -231,75 +395,43 @@ class GitHubRepository(Repository):
 
     @property
     def dependency_vulnerability_count(self):
-        if not self._dependencies:
+        dependency_vulnerabilities = self.dependency_vulnerabilities
+
+        return sum(count for count in dependency_vulnerabilities.values() if count is not None)
+
+    # Vulnerability count of each dependency, None for dependencies which can not be resolved.
+    @property
+    def dependency_vulnerabilities(self):
+        if self._dependency_vulnerabilities is not None:
+            return self._dependency_vulnerabilities
+
+        if self._dependencies is None:
             _ = self.dependency_count
 
-        total_vul_count = 0
-        for dependency in self._dependencies:
-            repo = get_repository(f"https://github.com/{dependency}")
-            repo_vul_count = repo.history_vulnerability_count
-            total_vul_count += repo_vul_count
+        self._dependency_vulnerabilities = get_dependency_graph().get_vulnerability_counts(
+            self._dependencies, get_dependency_vulnerability_count)
 
-        return total_vul_count
+        return self._dependency_vulnerabilities
 
     @property
     def history_vulnerability_severity(self):
-        if not self._vulnerability_cve_numbers:
+        if self._vulnerability_cve_numbers is None:
             _ = self.history_vulnerability_count
 
-        nvd_api_key = os.getenv("NVD_API_KEY")
-        assert nvd_api_key, "NVD_API_KEY needs to be set."
-        effective_vul_count = 0
-        total_cvss_score = 0
-        for cve_number in self._vulnerability_cve_numbers:
-            nvd_api_request_url = f"https://services.nvd.nist.gov/rest/json/cve/1.0/{cve_number}"
-            params = {
-                "q": "CVE",
-                "apiKey": nvd_api_key
-            }
-            response = requests.get(url=nvd_api_request_url, params=params)
-            if response.status_code == 200:
-                data = json.loads(response.content)
-                cve_item_impact = data.get("result").get("CVE_Items")[0].get("impact")
-                if "baseMetricV3" in cve_item_impact:
-                    base_score = cve_item_impact.get("baseMetricV3").get("cvssV3").get("baseScore")
-                    effective_vul_count += 1
-                    total_cvss_score += base_score
-                else:
-                    continue
-
-            else:
-                raise NVDQueryException
+        base_scores = self._get_cvss_base_scores_(self._vulnerability_cve_numbers)
+        effective_base_scores = [base_score for base_score in base_scores.values() if base_score is not None]
 
-        return round(total_cvss_score / effective_vul_count, 2)
+        return round(sum(effective_base_scores) / len(effective_base_scores), 2)
 
     @property
     def unfixed_vulnerability_severity(self):
-        if not self._unfixed_vulnerability_numbers:
+        if self._unfixed_vulnerability_numbers is None:
             _ = self.unfixed_vulnerability_count
 
-        nvd_api_key = os.getenv("NVD_API_KEY")
-        assert nvd_api_key, "NVD_API_KEY needs to be set."
-        effective_vul_count = 0
-        total_cvss_score = 0
-        for cve_number in self._unfixed_vulnerability_numbers:
-            nvd_api_request_url = f"https://services.nvd.nist.gov/rest/json/cve/1.0/{cve_number}?apiKey={nvd_api_key}"
-            params = {"q": "CVE"}
-            response = requests.get(url=nvd_api_request_url, params=params)
-            if response.status_code == 200:
-                data = json.loads(response.content)
-                cve_item_impact = data.get("result").get("CVE_Items")[0].get("impact")
-                if "baseMetricV3" in cve_item_impact:
-                    base_score = cve_item_impact.get("baseMetricV3").get("cvssV3").get("baseScore")
-                    effective_vul_count += 1
-                    total_cvss_score += base_score
-                else:
-                    continue
-
-            else:
-                raise NVDQueryException
+        base_scores = self._get_cvss_base_scores_(self._unfixed_vulnerability_numbers)
+        effective_base_scores = [base_score for base_score in base_scores.values() if base_score is not None]
 
-        return round(total_cvss_score / effective_vul_count, 2)
+        return round(sum(effective_base_scores) / len(effective_base_scores), 2)
 
     @property
     def commit_count(self):
@@ -378,38 +510,32 @@ class GitHubRepository(Repository):
         # start date: CVE record release date, issue opened date, and the date report on huntr.dev
         # fix date: commit date, issue closed date, the date release security advisory
 
-        if not self._vulnerability_cve_numbers:
+        if self._vulnerability_cve_numbers is None:
             _ = self.history_vulnerability_count
 
-        if not self._unfixed_vulnerability_numbers:
+        if self._unfixed_vulnerability_numbers is None:
             _ = self.unfixed_vulnerability_count
 
         total_days = 0
+        undated_count = 0
+        cve_records = self._get_cve_records_(self._vulnerability_cve_numbers)
         for cve_number in self._vulnerability_cve_numbers:
             if cve_number in self._unfixed_vulnerability_numbers:
                 continue
 
-            # CVE record release date
-            url = f"https://cve.mitre.org/cgi-bin/cvename.cgi?name={cve_number}"
-            response = requests.get(url=url, headers=HTTP_REQUEST_HEADER)
-            if response.status_code == 200:
-                html = response.text
-                bs = BeautifulSoup(html, "html.parser")
-                record_release_date_regex = re.compile("[0-9]{8}")
-                result = bs.find(name="b", text=record_release_date_regex).text
-                ref_set = bs.select("li a[target='_blank']")
-                cve_release_date = datetime.datetime.strptime(f"{result[0: 4]}-{result[4: 6]}-{result[6:]}", "%Y-%m"
-                                                                                                             "-%d")
-            else:
-                raise PageOpenException(url, response.status_code)
+            # CVE record release date, CVEs released on an unknown date are left out of the average.
+            cve_record = cve_records[cve_number]
+            if cve_record.record_date is None:
+                undated_count += 1
+                continue
+            cve_release_date = cve_record.record_date
 
             issue_href = None
             huntr_href = None
             commit_href = None
             advisory_href = None
             release_href = None
-            for ref in ref_set:
-                href = ref.attrs["href"]
+            for href in cve_record.references:
                 expected_issue_path = f"https://github.com/{self._repo.full_name}/issues"
                 if expected_issue_path in href:
                     issue_href = href
@@ -440,11 +566,9 @@ class GitHubRepository(Repository):
 
             # huntr report date
             if huntr_href:
-                response = requests.get(url=huntr_href, headers=HTTP_REQUEST_HEADER)
+                response = get_transport().get(huntr_href, headers=HTTP_REQUEST_HEADER)
                 if response.status_code == 200:
-                    html = response.text
-                    bs = BeautifulSoup(html, "html.parser")
-                    result = bs.find(name="p", text="Reported on").findNext("p").text.strip()
+                    result = get_html_extractor().get_huntr_reported_on(response.text)
                     splitted_result = result.split(" ", 2)
                     formatted_result = f"{splitted_result[0]} {splitted_result[1][: -2]} {splitted_result[2]}"
                     huntr_report_date = datetime.datetime.strptime(formatted_result, "%b %d %Y")
@@ -475,11 +599,9 @@ class GitHubRepository(Repository):
 
             # security advisory publish date
             if advisory_href:
-                response = requests.get(advisory_href)
+                response = get_transport().get(advisory_href)
                 if response.status_code == 200:
-                    html = response.text
-                    bs = BeautifulSoup(html, "html.parser")
-                    result = bs.find(name="relative-time").attrs["relative-time"]
+                    result = get_html_extractor().get_relative_time(response.text, "relative-time")
                     advisory_date = datetime.datetime.strptime(result, "%Y-%m-%dT%H:%M:%SZ")
                 else:
                     advisory_date = datetime.datetime.utcnow()
@@ -489,11 +611,9 @@ class GitHubRepository(Repository):
 
             # release date
             if release_href:
-                response = requests.get(release_href)
+                response = get_transport().get(release_href)
                 if response.status_code == 200:
-                    html = response.text
-                    bs = BeautifulSoup(html, "html.parser")
-                    result = bs.find(name="relative-time").attrs["relative-time"]
+                    result = get_html_extractor().get_relative_time(response.text, "relative-time")
                     release_date = datetime.datetime.strptime(result, "%Y-%m-%dT%H:%M:%SZ")
                 else:
                     release_date = datetime.datetime.utcnow()
@@ -506,7 +626,10 @@ class GitHubRepository(Repository):
             time_gap = max((fix_date - reported_date).days, 0)
             total_days += time_gap
 
-        return round(total_days / len(self._vulnerability_cve_numbers), 2)
+        if undated_count and undated_count == len(self._vulnerability_cve_numbers):
+            return 0
+
+        return round(total_days / (len(self._vulnerability_cve_numbers) - undated_count), 2)
 
     @property
     def contributor_count(self):
@@ -520,13 +643,12 @@ class GitHubRepository(Repository):
     def outside_contributor_count(self):
         org = self._repo.organization.login
         outside_contributor_count = 0
-        contributors = self._repo.get_contributors()
-        for contributor in contributors[: 5000]:
-            contributor_orgs = contributor.get_orgs()
-            for contributor_org in contributor_orgs:
-                if contributor_org.login == org:
-                    outside_contributor_count += 1
-                    break
+        contributors = self._get_contributors_()[: 5000]
+        profiles = self._get_contributor_profiles_(contributors, with_orgs=True)
+        for contributor in contributors:
+            profile = profiles.get(contributor.login)
+            if profile is not None and org in profile.orgs:
+                outside_contributor_count += 1
 
         return outside_contributor_count
 
@@ -538,11 +660,13 @@ class GitHubRepository(Repository):
                 'llc', '').replace('@', '').replace(' ', '').rstrip(',')
 
         orgs = set()
-        contributors = self._repo.get_contributors()[:TOP_CONTRIBUTOR_COUNT]
+        contributors = self._get_top_contributors_()
         try:
+            profiles = self._get_contributor_profiles_(contributors)
             for contributor in contributors:
-                if contributor.company:
-                    orgs.add(_filter_name_(contributor.company))
+                profile = profiles.get(contributor.login)
+                if profile is not None and profile.company:
+                    orgs.add(_filter_name_(profile.company))
         except NumberExceedCapException:
             # Very large number of contributors, i.e. 5000+. Cap at 10.
             return 10
@@ -550,20 +674,20 @@ class GitHubRepository(Repository):
 
     @property
     def contributor_capacity(self):
-        contributors = self._repo.get_contributors()
+        contributors = [contributor for contributor in self._get_contributors_() if contributor.contributions >= 50]
+        profiles = self._get_contributor_profiles_(contributors)
         valid_contributor_count = 0
         follower_count = 0
         for contributor in contributors:
-            contributions = contributor.contributions
-            if contributions < 50:
+            profile = profiles.get(contributor.login)
+            if profile is None:
                 continue
 
             valid_contributor_count += 1
-            company = contributor.company
-            if company:
-                follower_count += contributor.followers
+            if profile.company:
+                follower_count += profile.followers
             else:
-                follower_count += round(contributor.followers * 0.5)
+                follower_count += round(profile.followers * 0.5)
 
         return round(follower_count / valid_contributor_count, 2)
 
@@ -599,21 +723,27 @@ class GitHubRepository(Repository):
             "whl"
         ]
 
-        # List all files in GitHub repository.
-        default_branch = self._repo.default_branch
-        files = self._repo.get_git_tree(sha=default_branch, recursive=True).tree
-        for file in files:
+        # List binary files in GitHub repository.
+        tree = self._get_tree_snapshot_()
+        for file in tree.by_suffix(*_binary_artifact_list_):
             if file.type == "blob":
-                path = file.path
-                suffix = path.split(".")[-1].lower()
-                if suffix in _binary_artifact_list_:
-                    score -= 1
+                score -= 1
 
                 if score <= MIN_SCORE:
                     break
 
         return score
 
+    # Branches targeted by the latest releases, release targets given as commit SHAs are not branches.
+    def _get_release_targets_(self):
+        url = f"https://api.github.com/repos/{self._repo.full_name}/releases"
+        response = request_github("GET", url, params={"per_page": 100})
+        if response.status_code != 200:
+            raise PageOpenException(url, response.status_code)
+
+        targets = [release.get("target_commitish") for release in json.loads(response.content)]
+        return [target for target in targets if target and not re.fullmatch("[0-9a-f]{40}", target)]
+
     @property
     def branch_protection(self):
         # Points increment at each level
@@ -628,156 +758,35 @@ class GitHubRepository(Repository):
         _max_score_for_context_protection_ = 1
         _max_score_for_thorough_review_protection_ = 1
 
-        # Checks branch protection on release and development branch.
-        branch_name_list = []
-        # Get development branches.
-        repo_branches = self._repo.get_branches()
-        for branch in repo_branches:
-            branch_name_list.append(branch.name)
-
-        # Get release branches.
-        releases = self._repo.get_releases()
-        for release in releases:
-            target_commitish = release.target_commitish
-            if target_commitish:
-                if target_commitish not in branch_name_list:
-                    branch_name_list.append(target_commitish)
-
-        # Add default branch.
-        if self._repo.default_branch not in branch_name_list:
-            branch_name_list.append(self._repo.default_branch)
-
-        branch_reference_list = []
-        # Checks protection on all branches.
-        for branch_name in branch_name_list:
-            branch = self._repo.get_branch(branch_name)
-            protected = branch.protected
-
-            # Initialize branch protection.
-            branch_protection = {
-                "required_pull_request_reviews": {
-                    "required_approving_review_count": 0,
-                    "require_code_owner_reviews": False
-                },
-                "allow_deletions": False,
-                "allow_force_pushes": False,
-                "required_linear_history": False,
-                "required_status_checks": {
-                    "strict": False,
-                    "required_status_checks": False,
-                    "context": []
-                }
-            }
-
-            # Check protection.
-            protection = branch.get_protection()
-            branch_protection["required_pull_request_reviews"]["required_approving_review_count"] = \
-                protection.required_pill_request.reviews.required_approving_review_count
-            branch_protection["required_pull_request_reviews"]["require_code_owner_reviews"] = \
-                protection.required_pill_request.require_code_owner_reviews
-            branch_protection["allow_deletions"] = protection.allow_deletions.enabled
-            branch_protection["allow_force_pushes"] = protection.allow_force_pushes.enabled
-            branch_protection["required_linear_history"] = protection.required_linear_history.enable
-            branch_protection["required_status_checks"]["strict"] = protection.required_status_checks.strict
-            branch_protection["required_status_checks"]["required_status_checks"] = True if \
-                len(protection.required_status_checks.checks) != 0 else False
-            branch_protection["required_status_checks"]["context"] = protection.required_status_checks.context
-
-            branch_reference = {
-                "protected": protected,
-                "branch_protection": branch_protection
-            }
-            branch_reference_list.append(deepcopy(branch_reference))
-
-        scores = []
-        for branch_reference in branch_reference_list:
-            is_protected = branch_reference["protected"]
-            branch_protection = branch_reference["branch_protection"]
-            if not is_protected:
-                continue
-
-            # Score template for calculating scores.
-            score_template = {
-                "basic": 0,
-                "review": 0,
-                "context": 0,
-                "thorough_review": 0
-            }
-
-            # Calculating basic score.
-            basic_score = 0
-            if not branch_protection["allow_deletions"]:
-                basic_score += 1
-
-            if not branch_protection["allow_force_pushes"]:
-                basic_score += 1
-
-            score_template["basic"] = basic_score
-
-            # Calculating review score.
-            review_score = 0
-            if branch_protection["required_pull_request_reviews"]["required_approving_review_count"] > 0:
-                review_score += 1
-
-            score_template["review"] = review_score
-
-            # Calculating context score.
-            context_score = 0
-            if len(branch_protection["required_status_checks"]["context"]) > 0:
-                context_score += 1
-
-            score_template["context"] = context_score
-
-            # Calculating thorough review score.
-            thorough_review_score = 0
-            if branch_protection["required_pull_request_reviews"]["required_approving_review_count"] >= 2:
-                thorough_review_score += 1
-
-            score_template["thorough_review"] = thorough_review_score
-
-            scores.append(deepcopy(score_template))
-
-        # Calculate score for all branches.
-        if len(scores) == 0:  # No branch enables branch protection
+        # Checks branch protection on the default branch and release branches, unprotected branches do not count.
+        branch_names = [self._repo.default_branch] + self._get_release_targets_()
+        protections = get_branch_protections(self._repo.full_name, branch_names, request_github_graphql)
+        protections = [protection for protection in protections.values() if protection is not None]
+        if len(protections) == 0:  # No branch enables branch protection
             return 0
 
-        score_sum = 0
-
-        # Calculate score in terms of basic score.
-        max_basic_score = len(scores) * _max_score_for_basic_protection_
         basic_score = 0
-        for score in scores:
-            basic_score += score["basic"]
-
-        # Add normalized result for basic score.
-        score_sum += int(basic_score / max_basic_score * _basic_level_)
-
-        # Calculate score in terms of review score.
-        max_review_score = len(scores) * _max_score_for_review_protection_
         review_score = 0
-        for score in scores:
-            review_score += score["review"]
-
-        # Add normalized result for review score.
-        score_sum += int(review_score / max_review_score * _review_level_)
-
-        # Calculate score in terms of context score.
-        max_context_score = len(scores) * _max_score_for_context_protection_
         context_score = 0
-        for score in scores:
-            context_score += score["context"]
-
-        # Add normalized result for context score.
-        score_sum += int(context_score / max_context_score * _context_level_)
-
-        # Calculate score in terms of thorough review score.
-        max_thorough_review_score = len(scores) * _max_score_for_thorough_review_protection_
         thorough_review_score = 0
-        for score in scores:
-            thorough_review_score += score["thorough_review"]
+        for protection in protections:
+            if not protection.allows_deletions:
+                basic_score += 1
+            if not protection.allows_force_pushes:
+                basic_score += 1
+            if protection.required_approving_review_count > 0:
+                review_score += 1
+            if len(protection.status_check_contexts) > 0:
+                context_score += 1
+            if protection.required_approving_review_count >= 2:
+                thorough_review_score += 1
 
-        # Add normalized result for thorough review score.
-        score_sum += int(thorough_review_score / max_thorough_review_score * _thorough_review_level_)
+        # Add the normalized result of each tier.
+        score_sum = int(basic_score / (len(protections) * _max_score_for_basic_protection_) * _basic_level_)
+        score_sum += int(review_score / (len(protections) * _max_score_for_review_protection_) * _review_level_)
+        score_sum += int(context_score / (len(protections) * _max_score_for_context_protection_) * _context_level_)
+        score_sum += int(thorough_review_score / (len(protections) * _max_score_for_thorough_review_protection_) *
+                         _thorough_review_level_)
 
         return score_sum
 
@@ -806,23 +815,19 @@ class GitHubRepository(Repository):
 
             return False
 
-        _look_back_commits_ = 30
         total_merged = 0
         total_tested = 0
 
         # Get recent commits.
-        commits = self._repo.get_commits()[: _look_back_commits_]
-        for commit in commits:
-            associated_pulls = commit.get_pulls()
-            if associated_pulls.totalCount == 0:
+        for commit in self._get_recent_commits_():
+            if commit.pull_request is None:
                 # This commit is not associated with any pull request.
                 continue
 
             total_merged += 1
 
             # GitHub statuses.
-            statuses = commit.get_statuses()
-            for status in statuses:
+            for status in commit.statuses:
                 if status.state != "success":
                     continue
 
@@ -831,15 +836,14 @@ class GitHubRepository(Repository):
                     continue
 
             # GitHub check runs.
-            check_runs = commit.get_check_runs()
-            for check_run in check_runs:
+            for check_run in commit.check_runs:
                 if check_run.status != "completed" or check_run.conclusion != "success":
                     continue
 
-                if _is_test_(check_run.app.slug):
+                if _is_test_(check_run.app_slug):
                     total_tested += 1
 
-        return int(min(total_tested / total_merged * MAX_SCORE), MAX_SCORE)
+        return int(min(total_tested / total_merged * MAX_SCORE, MAX_SCORE))
 
     @property
     def cii_best_practice(self):
@@ -855,7 +859,8 @@ class GitHubRepository(Repository):
         _gold_resp_ = "gold"
 
         repo_url = f"https://github.com/{self._repo.full_name}"
-        response = requests.get(f"https://bestpractices.coreinfrastructure.org/projects.json?url={repo_url}")
+        response = get_transport().get("https://bestpractices.coreinfrastructure.org/projects.json",
+                                       params={"url": repo_url})
         data = json.loads(response.content)
 
         if len(data) == 0:
@@ -875,58 +880,40 @@ class GitHubRepository(Repository):
 
     @property
     def code_review(self):
-        _look_back_commits_ = 30
         total_reviewed = 0
 
-        commits = self._repo.get_commits()[: _look_back_commits_]
+        commits = self._get_recent_commits_()
         for commit in commits:
-            associated_pulls = commit.get_pulls()
-            if associated_pulls.totalCount == 0:
+            pull = commit.pull_request
+            if pull is None:
                 # This commit is not associated with any pull request.
                 total_reviewed += 1
                 continue
 
             # Determine whether the project enables branch protection with at least one reviewer required.
-            pull = associated_pulls[0]
-            reviews = pull.get_reviews()
-            found_approved_review = False
-            for review in reviews:
-                if review.state == "approved":
-                    found_approved_review = True
-                    total_reviewed += 1
-                    break
-
-            if found_approved_review:
-                break
+            if pull.approved_review_count > 0:
+                total_reviewed += 1
+                continue
 
             # Determine whether the committer is different from that launch a merge request.
-            merge_request_author = pull.user.login
-            committer = commit.author.login
+            merge_request_author = pull.author_login
+            committer = commit.author_login
             if committer != "" and committer == merge_request_author:
                 total_reviewed += 1
 
-        total_commits = commits.totalCount
+        total_commits = len(commits)
         return int(total_reviewed / total_commits * MAX_SCORE)
 
     @property
     def dangerous_workflow(self):
-        file_paths = []
-        default_branch = self._repo.default_branch
-        files = self._repo.get_git_tree(sha=default_branch, recursive=True).tree
-        for file in files:
-            if file.type == "blob":
-                path = file.path
-                path = path.lower()
-                if is_workflow_file(path):
-                    file_name = path.split("/")[-1]
-                    if get_file_dir(path, file_name) == ".github/workflows/":
-                        file_paths.append(path)
+        import yaml
 
-        for file_path in file_paths:
-            if is_workflow_file(file_path):
+        workflows = self._get_workflow_store_()
+        for file in workflows.files:
+            if is_workflow_file(file.path):
                 continue
             try:
-                workflow = get_yaml_content(self._repo.full_name, self._repo.default_branch, file_path)
+                workflow = workflows.load(file).content
                 if not validate_untrusted_code_checkout(workflow):
                     return MIN_SCORE
 
@@ -954,13 +941,15 @@ class GitHubRepository(Repository):
             ".renovaterc"
         ]
 
+        file_names = set()
+        for configuration in _dependabot_configuration_ + _renovatebot_configuration_:
+            file_names.add(configuration.split("/")[-1])
+
+        tree = self._get_tree_snapshot_()
         file_paths = []
-        default_branch = self._repo.default_branch
-        files = self._repo.get_git_tree(sha=default_branch, recursive=True).tree
-        for file in files:
+        for file in tree.by_basename(*file_names):
             if file.type == "blob":
-                path = file.path
-                file_paths.append(path)
+                file_paths.append(file.path)
 
         # 1 for dependabot and 0 for renovate bot.
         dependency_update_tools = []
@@ -1000,23 +989,17 @@ class GitHubRepository(Repository):
 
     @property
     def fuzzing(self):
-        default_branch = self._repo.default_branch
-        files = self._repo.get_git_tree(sha=default_branch, recursive=True).tree
-        for file in files:
-            if file.type == "blob":
-                path = file.path
-                if path == "project.yaml":
-                    return MAX_SCORE
-
-                if is_workflow_file(path):
-                    file_name = path.split("/")[-1]
-                    if get_file_dir(path, file_name) == ".clusterfuzzlite":
-                        if file_name == "Dockerfile":
-                            text = get_text(self._repo.full_name, default_branch, path)
-                            lines = text.split("\s*")
-                            for line in lines:
-                                if line.strip().index("#") == 0:
-                                    return MAX_SCORE
+        tree = self._get_tree_snapshot_()
+        file = tree.get("project.yaml")
+        if file and file.type == "blob" and file.path == "project.yaml":
+            return MAX_SCORE
+
+        for file in tree.by_directory(".clusterfuzzlite/"):
+            if file.type == "blob" and file.name == "Dockerfile":
+                text = self._read_text_(file)
+                for line in text.splitlines():
+                    if line.strip().startswith("#"):
+                        return MAX_SCORE
 
         return MIN_SCORE
 
@@ -1028,88 +1011,72 @@ class GitHubRepository(Repository):
             "OWNER"
         ]
 
-        # If the repository marked archived.
-        if self._repo.archive:
-            return MIN_SCORE
+        # Recent commits are counted on the server, recent open issues are paged 100 at a time together with
+        # the author association of the issue and of its first 50 comments.
+        query = 'query($owner:String!, $name:String!, $commit_since:GitTimestamp!, $issue_since:DateTime!, ' \
+                '$cursor:String) {repository(owner:$owner, name:$name) {isArchived ' \
+                'defaultBranchRef {target {... on Commit {history(since:$commit_since) {totalCount}}}} ' \
+                'issues(first:100, after:$cursor, states:OPEN, filterBy:{since:$issue_since}) {' \
+                'pageInfo {hasNextPage endCursor} nodes {authorAssociation comments(first:50) {' \
+                'nodes {authorAssociation}}}}}}'
 
         # To check whether there is at least one commit per week.
         commit_since_time = datetime.datetime.utcnow() - datetime.timedelta(days=COMMIT_LOOKBACK_DAYS)
-        recent_commits = self._repo.get_commits(since=commit_since_time)
 
         # To check whether there is issue from users who are collaborators, member or owner of the repository.
         issues_since_time = datetime.datetime.utcnow() - datetime.timedelta(days=ISSUE_LOOKBACK_DAYS)
-        recent_issues = self._repo.get_issues(since=issues_since_time)
 
-        activity_from_collaborator_or_higher = 0
-        github_auth_headers = {
-            "Authorization": f"bearer {_CACHED_GITHUB_TOKEN}"
-        }
-        graphql_url = "https://api.github.com/graphql"
         temp = self._repo.full_name.split("/")
-        for issue in recent_issues:
-            query = 'query($owner:String!, $name:String!, $issue_number:Int!) {repository(owner:$owner, name:$name) {' \
-                    'issue(number:$issue_number) {authorAssociation}}} '
-            data = {
-                "query": query,
-                "variables": {
-                    "owner": temp[0],
-                    "name": temp[1],
-                    "issue_number": issue.id
-                }
-            }
-            response = requests.post(url=graphql_url, data=json.dumps(data), headers=github_auth_headers)
-            result = json.loads(response.content)
-            author_association = result["data"]["repository"]["issue"]["authorAssociation"]
-            if author_association in _roles_:
-                activity_from_collaborator_or_higher += 1
-                continue
+        variables = {
+            "owner": temp[0],
+            "name": temp[1],
+            "commit_since": commit_since_time.strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "issue_since": issues_since_time.strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "cursor": None
+        }
 
-            query = 'query($owner:String!, $name:String!, $issue_number:Int!) {repository(owner:$owner, name:$name) {' \
-                    'issue(number:$issue_number) {comments(first:50) {' \
-                    'edges{node{authorAssociation}}}}}} '
-            data = {
-                "query": query,
-                "variables": {
-                    "owner": temp[0],
-                    "name": temp[1],
-                    "issue_number": issue.id
-                }
-            }
-            response = requests.post(url=graphql_url, data=json.dumps(data), headers=github_auth_headers)
-            result = json.loads(response.content)
-            edges = result["data"]["issue"]["comments"]["edges"]
-            for edge in edges:
-                author_association = edge["node"]["authorAssociation"]
-                if author_association in _roles_:
+        recent_commit_count = 0
+        activity_from_collaborator_or_higher = 0
+        while True:
+            repository = request_github_graphql(query, variables)["data"]["repository"]
+            if variables["cursor"] is None:
+                # If the repository marked archived.
+                if repository["isArchived"]:
+                    return MIN_SCORE
+
+                if repository["defaultBranchRef"]:
+                    recent_commit_count = repository["defaultBranchRef"]["target"]["history"]["totalCount"]
+
+            issues = repository["issues"]
+            for issue in issues["nodes"]:
+                if issue["authorAssociation"] in _roles_:
                     activity_from_collaborator_or_higher += 1
-                    break
+                    continue
+
+                for comment in issue["comments"]["nodes"]:
+                    if comment["authorAssociation"] in _roles_:
+                        activity_from_collaborator_or_higher += 1
+                        break
 
-        return int((recent_commits.totalCount + activity_from_collaborator_or_higher) /
+            if not issues["pageInfo"]["hasNextPage"]:
+                break
+            variables["cursor"] = issues["pageInfo"]["endCursor"]
+
+        return int((recent_commit_count + activity_from_collaborator_or_higher) /
                    (ACTIVITY_PER_WEEK * LOOK_BACK_DAYS / DAY_IN_ONT_WEEK) * MAX_SCORE)
 
     @property
     def packaging(self):
-        file_paths = []
-        default_branch = self._repo.default_branch
-        files = self._repo.get_git_tree(sha=default_branch, recursive=True).tree
-        for file in files:
-            if file.type == "blob":
-                path = file.path
-                path = path.lower()
-                if is_workflow_file(path):
-                    file_name = path.split("/")[-1]
-                    if get_file_dir(path, file_name) == ".github/workflows/":
-                        file_paths.append(path)
-
-        for file_path in file_paths:
-            workflow = get_yaml_content(self._repo.full_name, self._repo.default_branch, file_path)
+        workflows = self._get_workflow_store_()
+        for file in workflows.files:
+            workflow = workflows.load(file).content
             if not workflow:
                 return MIN_SCORE
 
             if not is_packaging_workflow(workflow):
                 continue
 
-            runs = self._repo.get_workflow(file_path.split("/")[-1]).get_runs(status="success")
+            runs = self._repo.get_workflow(file.name).get_runs(status="success")
             if runs.totalCount > 0:
                 return MAX_SCORE
 
@@ -1119,8 +1086,8 @@ class GitHubRepository(Repository):
     def sast(self):
         sast_weight = 0.3
         codeql_weight = 0.7
-        sast_score = sast_tools_in_check_run(self._repo)
-        codeql_score = codeql_in_check_definitions(self._repo)
+        sast_score = sast_tools_in_check_run(self._get_recent_commits_())
+        codeql_score = codeql_in_check_definitions(self._get_workflow_store_())
 
         # Both results are inconclusive.
         if sast_score == INCONCLUSIVE_RESULT_SCORE and codeql_score == INCONCLUSIVE_RESULT_SCORE:
@@ -1160,14 +1127,11 @@ class GitHubRepository(Repository):
             "docs/security.rst": True
         }
 
-        default_branch = self._repo.default_branch
-        files = self._repo.get_git_tree(sha=default_branch, recursive=True).tree
-        for file in files:
-            if file.type == "blob":
-                path = file.path
-                path = path.lower()
-                if security_policy_file_path[path]:
-                    return MAX_SCORE
+        tree = self._get_tree_snapshot_()
+        for path in security_policy_file_path:
+            file = tree.get(path)
+            if file and file.type == "blob" and security_policy_file_path[path]:
+                return MAX_SCORE
 
         return MIN_SCORE
 
@@ -1204,6 +1168,8 @@ class GitHubRepository(Repository):
 
     @property
     def token_permission(self):
+        import yaml
+
         permission_of_interest = [
             "statuses",
             "checks",
@@ -1219,20 +1185,11 @@ class GitHubRepository(Repository):
             "contents",
             "security-events"
         ]
-        file_paths = []
-        default_branch = self._repo.default_branch
-        files = self._repo.get_git_tree(sha=default_branch, recursive=True).tree
-        for file in files:
-            if file.type == "blob":
-                path = file.path
-                path = path.lower()
-                if is_workflow_file(path):
-                    file_name = path.split("/")[-1]
-                    if get_file_dir(path, file_name) == ".github/workflows/":
-                        file_paths.append(path)
+        workflows = self._get_workflow_store_()
 
         data = {}
-        for file_path in file_paths:
+        for file in workflows.files:
+            file_path = file.path
             data[file_path] = {
                 "top_level_write_permissions": {
                     "statuses": False,
@@ -1256,7 +1213,7 @@ class GitHubRepository(Repository):
                 }
             }
             try:
-                workflow = get_yaml_content(self._repo.full_name, self._repo.default_branch, file_path)
+                workflow = workflows.load(file).content
                 # Top level
                 if workflow.get("permissions"):
                     permissions = workflow["permissions"]
@@ -1356,83 +1313,50 @@ class GitHubRepository(Repository):
         if self._repo.description:
             meet_requirement_count += 1
 
+        # Community files are looked up in the root, .github/ and docs/ directories.
+        _community_file_dirs_ = ("", ".github/", "docs/")
+        tree = self._get_tree_snapshot_()
+
         # Find readme.
-        default_branch = self._repo.default_branch
-        files = self._repo.get_git_tree(sha=default_branch, recursive=True).tree
-        for file in files:
-            if file.type == "blob":
-                path = file.path
-                path = path.lower()
-                if is_readme(path):
-                    file_name = path.split("/")[-1]
-                    if get_file_dir(path, file_name) == ".github/" or \
-                            get_file_dir(path, file_name) == "docs" or \
-                            get_file_dir(path, file_name) == "":
-                        meet_requirement_count += 1
-                        break
+        for file in tree.by_basename("readme.md"):
+            if file.type == "blob" and file.directory.lower() in _community_file_dirs_:
+                meet_requirement_count += 1
+                break
 
         # Find code of conduct
-        for file in files:
-            if file.type == "blob":
-                path = file.path
-                path = path.lower()
-                if is_code_of_conduct(path):
-                    file_name = path.split("/")[-1]
-                    if get_file_dir(path, file_name) == ".github/" or \
-                            get_file_dir(path, file_name) == "docs" or \
-                            get_file_dir(path, file_name) == "":
-                        meet_requirement_count += 1
-                        break
+        for file in tree.by_basename("code_of_conduct.md"):
+            if file.type == "blob" and file.directory.lower() in _community_file_dirs_:
+                meet_requirement_count += 1
+                break
 
         # Find contributing.
-        for file in files:
-            if file.type == "blob":
-                path = file.path
-                path = path.lower()
-                if is_contributing(path):
-                    file_name = path.split("/")[-1]
-                    if get_file_dir(path, file_name) == ".github/" or \
-                            get_file_dir(path, file_name) == "docs" or \
-                            get_file_dir(path, file_name) == "":
-                        meet_requirement_count += 1
-                        break
+        for file in tree.by_basename("contributing.md"):
+            if file.type == "blob" and file.directory.lower() in _community_file_dirs_:
+                meet_requirement_count += 1
+                break
 
         # Find License.
-        for file in files:
-            if file.type == "blob":
-                path = file.path
-                path = path.lower()
-                if is_license(path):
-                    file_name = path.split("/")[-1]
-                    if get_file_dir(path, file_name) == "":
-                        meet_requirement_count += 1
-                        break
+        for file in tree.by_directory(""):
+            if file.type == "blob" and is_license(file.path):
+                meet_requirement_count += 1
+                break
 
         # Find issue template.
-        for file in files:
-            path = file.path
-            path = path.lower()
-            if is_issue_template(path):
-                file_name = path.split("/")[-1]
-                if get_file_dir(path, file_name) == ".github/":
-                    meet_requirement_count += 1
-                    break
+        for file in tree.by_directory(".github/"):
+            if is_issue_template(file.path):
+                meet_requirement_count += 1
+                break
 
         # Find pull request template.
-        for file in files:
-            path = file.path
-            path = path.lower()
-            if is_pull_request_template(path):
-                file_name = path.split("/")[-1]
-                if get_file_dir(path, file_name) == ".github/":
-                    meet_requirement_count += 1
-                    break
+        for file in tree.by_directory(".github/"):
+            if is_pull_request_template(file.path):
+                meet_requirement_count += 1
+                break
 
         return int(meet_requirement_count / total_requirement_count * MAX_SCORE)
 
 
-_CACHED_GITHUB_TOKEN = None
-_CACHED_GITHUB_TOKEN_OBJ = None
+_TOKEN_POOL = None
 
 
 def use_event_trigger(workflow, trigger_name):
@@ -1619,17 +1543,11 @@ def get_file_dir(file_path, file_name):
     return result
 
 
-def is_workflow_file(file_path):
-    suffix = file_path.split(".")[-1]
-    if suffix == "yml" or suffix == "yaml":
-        return True
-    else:
-        return False
-
-
 def get_yaml_content(full_name, default_branch, file_path):
+    import yaml
+
     url = f"https://raw.githubusercontent.com/{full_name}/{default_branch}/{file_path}"
-    response = requests.get(url)
+    response = get_transport().get(url)
     try:
         return yaml.safe_load(bytes(response.text, encoding="utf-8"))
     except yaml.YAMLError:
@@ -1638,7 +1556,7 @@ def get_yaml_content(full_name, default_branch, file_path):
 
 def get_text(full_name, default_branch, file_path):
     url = f"https://raw.githubusercontent.com/{full_name}/{default_branch}/{file_path}"
-    response = requests.get(url)
+    response = get_transport().get(url)
     if response.status_code == 200:
         return response.text
     else:
@@ -1647,9 +1565,9 @@ def get_text(full_name, default_branch, file_path):
 
 def get_file_content(full_name, default_branch, file_path):
     url = f"https://raw.githubusercontent.com/{full_name}/{default_branch}/{file_path}"
-    response = requests.get(url)
+    response = get_transport().get(url)
     if response.status_code != 200:
-        raise PageOpenException
+        raise PageOpenException(url, response.status_code)
 
     return response.text
 
@@ -1687,10 +1605,10 @@ def is_packaging_workflow(workflow):
     return False
 
 
-def sast_tools_in_check_run(repo):
+def sast_tools_in_check_run(commits):
     allow_conclusion = {
         "success": True,
-        "neural": True
+        "neutral": True
     }
     sast_tools = {
         "github-code-scanning": True,
@@ -1698,103 +1616,120 @@ def sast_tools_in_check_run(repo):
         "sonarcloud": True
     }
     # Get sast score.
-    commits = repo.get_commits()[: 30]
     total_merged = 0
     total_tested = 0
-    if commits.totalCount == 0:
-        return INCONCLUSIVE_RESULT_SCORE
-
     for commit in commits:
-        associated_pulls = commit.get_pulls()
-        if associated_pulls.totalCount == 0:
+        if commit.pull_request is None:
             continue
 
-        check_runs = commit.get_check_runs()
-
-        for check_run in check_runs:
+        total_merged += 1
+        for check_run in commit.check_runs:
             if check_run.status != "completed":
                 continue
 
-            if not allow_conclusion[check_run.conclusion]:
+            if not allow_conclusion.get(check_run.conclusion):
                 continue
 
-            if sast_tools[check_runs.app.slug]:
+            if sast_tools.get(check_run.app_slug):
                 total_tested += 1
+                break
+
+    if total_merged == 0:
+        return INCONCLUSIVE_RESULT_SCORE
 
     return int(total_tested / total_merged * MAX_SCORE)
 
 
-def codeql_in_check_definitions(repo):
+def codeql_in_check_definitions(workflows):
     # Get codeql score.
-    file_paths = []
-    default_branch = repo.default_branch
-    files = repo.get_git_tree(sha=default_branch, recursive=True).tree
-    for file in files:
-        if file.type == "blob":
-            path = file.path
-            path = path.lower()
-            if is_workflow_file(path):
-                file_name = path.split("/")[-1]
-                if get_file_dir(path, file_name) == ".github/workflows/":
-                    file_paths.append(path)
-
     pattern = re.compile("github/codeql-action/analyze")
-    for file_path in file_paths:
-        try:
-            file_content = get_file_content(repo.full_name, default_branch, file_path)
-            if pattern.findall(file_content):
-                return MAX_SCORE
-
-        except PageOpenException:
+    for file in workflows.files:
+        file_content = workflows.load(file).text
+        if file_content is None:
             return INCONCLUSIVE_RESULT_SCORE
 
+        if pattern.findall(file_content):
+            return MAX_SCORE
+
     return MIN_SCORE
 
 
 # Source repository on GitHub.
 def request_url_with_auth_header(url):
-    headers = {}
-    if 'github.com' in url and _CACHED_GITHUB_TOKEN:
-        headers = {'Authorization': f'token {_CACHED_GITHUB_TOKEN}'}
+    if 'github.com' not in url:
+        return get_transport().get(url)
+
+    return request_github("GET", url)
+
+
+# Send a request to GitHub with a token from the pool, and record the rate limit it reports.
+# GET requests are conditional on the cached response, 304 responses do not count against the rate limit.
+def request_github(method, url, bucket=CORE_BUCKET, headers=None, **kwargs):
+    token_pool = get_token_pool()
+    token_state = token_pool.acquire(bucket)
+    headers = dict(headers or {})
+    headers["Authorization"] = f"token {token_state.token}"
+    response = get_transport().request(method, url, headers=headers, cache=method.upper() == "GET", **kwargs)
+    token_pool.update(token_state.token, response.headers)
+    return response
+
+
+def request_github_graphql(query, variables):
+    data = {
+        "query": select_graphql_cost(query),
+        "variables": variables
+    }
+    response = request_github("POST", "https://api.github.com/graphql", bucket=GRAPHQL_BUCKET, json=data)
+    result = json.loads(response.content)
+    if result.get("errors") and not result.get("data"):
+        raise GraphQLException(result["errors"])
+
+    return result
+
+
+# Resolve the history vulnerability count of a dependency, None if it is missing or a fork.
+def get_dependency_vulnerability_count(dependency):
+    try:
+        repo = get_repository(f"https://github.com/{dependency}")
+    except URLException:
+        return None
+
+    if repo is None:
+        return None
+
+    return repo.history_vulnerability_count
+
+
+# Fetch the profile of a GitHub user, with organization memberships if asked, None if the user does not exist.
+def fetch_user_profile(login, with_orgs=False):
+    try:
+        user = get_github_auth_token().get_user(login)
+    except github.UnknownObjectException:
+        return None
+
+    orgs = None
+    if with_orgs:
+        orgs = tuple(org.login for org in user.get_orgs())
+
+    return UserProfile(login, user.company, user.followers, orgs)
 
-    return requests.get(url, headers=headers)
 
+# get the pool of github authorization tokens
+def get_token_pool():
+    global _TOKEN_POOL
+    if _TOKEN_POOL is None:
+        github_auth_token = os.getenv("GITHUB_AUTH_TOKEN")
+        assert github_auth_token, "GITHUB_AUTH_TOKEN needs to be set."
+        tokens = [token.strip() for token in github_auth_token.split(',') if token.strip()]
+        _TOKEN_POOL = TokenPool(tokens)
+        install_connection_classes(_TOKEN_POOL)
 
-# Return expiry information of the given GitHub token.
-def get_github_token_info(token_obj):
-    rate_limit = token_obj.get_rate_limit()
-    near_expiry = rate_limit.core.remaining < 50
-    wait_time = (rate_limit.core.reset - datetime.datetime.utcnow()).seconds
-    return near_expiry, wait_time
+    return _TOKEN_POOL
 
 
-# get a github authorization token
+# get a github client, its requests to the GitHub API are authorized per request with a token of the pool
 def get_github_auth_token():
-    global _CACHED_GITHUB_TOKEN
-    global _CACHED_GITHUB_TOKEN_OBJ
-    if _CACHED_GITHUB_TOKEN_OBJ:
-        near_expiry, _ = get_github_token_info(_CACHED_GITHUB_TOKEN_OBJ)
-        if not near_expiry:
-            return _CACHED_GITHUB_TOKEN_OBJ
-
-    github_auth_token = os.getenv("GITHUB_AUTH_TOKEN")
-    assert github_auth_token, "GITHUB_AUTH_TOKEN needs to be set."
-    tokens = github_auth_token.split(',')
-
-    min_wait_time = None
-    token_obj = None
-    for token in tokens:
-        token_obj = github.Github(token)
-        near_expiry, wait_time = get_github_token_info(token_obj)
-        if not min_wait_time or wait_time < min_wait_time:
-            min_wait_time = wait_time
-        if not near_expiry:
-            _CACHED_GITHUB_TOKEN = token
-            _CACHED_GITHUB_TOKEN_OBJ = token_obj
-            return token_obj
-
-    time.sleep(min_wait_time)
-    return token_obj
+    return get_token_pool().acquire_github()
 
 
 # return repository object, given a url
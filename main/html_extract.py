@@ -0,0 +1,293 @@
+"""
+
+Extraction of the few values the estimator scrapes from HTML pages.
+
+The scrapes only need a handful of anchors, one <b> or one <relative-time>
+element, so building a full BeautifulSoup tree for each page is wasted work
+when scoring in bulk. Each backend implements the same extractions: selectolax
+(lexbor) and lxml parse in C, regex scans the markup for the few tags needed,
+and bs4 is the reference the others are checked against. The fastest backend
+installed is used unless OSS_HTML_BACKEND names one. Parsers are imported
+the first time their backend extracts something.
+
+"""
+
+import os
+import re
+import html as html_
+import importlib.util
+
+CVE_NUMBER_REGEX = re.compile("CVE-[0-9]{4}-[0-9]{4,}")
+RECORD_DATE_REGEX = re.compile("[0-9]{8}")
+
+
+class HtmlExtractor:
+    name = None
+    # Module of the parser, the backend is available when it is installed.
+    module = None
+
+    def _parse_(self, html):
+        raise NotImplementedError
+
+    # Hrefs of the dependency links of a GitHub dependency graph page.
+    def get_dependency_hrefs(self, html):
+        raise NotImplementedError
+
+    # Texts of the links to CVEs of a cvekey.cgi page.
+    def get_cve_numbers(self, html):
+        raise NotImplementedError
+
+    # Return (record date text or None, reference hrefs) of a cvename.cgi page.
+    def get_cve_record(self, html):
+        raise NotImplementedError
+
+    # Text following "Reported on" on a huntr bounty page, or None.
+    def get_huntr_reported_on(self, html):
+        raise NotImplementedError
+
+    # Attribute of the first <relative-time> element of a page, or None.
+    def get_relative_time(self, html, attribute):
+        raise NotImplementedError
+
+
+class Bs4Extractor(HtmlExtractor):
+    name = "bs4"
+    module = "bs4"
+
+    def _parse_(self, html):
+        from bs4 import BeautifulSoup
+        return BeautifulSoup(html, "html.parser")
+
+    def get_dependency_hrefs(self, html):
+        bs = self._parse_(html)
+        result_set = bs.find_all(name="a", attrs={"data-octo-click": "dep_graph_package"})
+        return [result.attrs["href"] for result in result_set]
+
+    def get_cve_numbers(self, html):
+        bs = self._parse_(html)
+        return [result.text.strip() for result in bs.find_all(name="a", text=CVE_NUMBER_REGEX)]
+
+    def get_cve_record(self, html):
+        bs = self._parse_(html)
+        result = bs.find(name="b", text=RECORD_DATE_REGEX)
+        references = [ref.attrs["href"] for ref in bs.select("li a[target='_blank']")]
+        return (result.text.strip() if result else None), references
+
+    def get_huntr_reported_on(self, html):
+        bs = self._parse_(html)
+        result = bs.find(name="p", text="Reported on")
+        if result is None or result.findNext("p") is None:
+            return None
+
+        return result.findNext("p").text.strip()
+
+    def get_relative_time(self, html, attribute):
+        bs = self._parse_(html)
+        result = bs.find(name="relative-time")
+        return result.attrs.get(attribute) if result else None
+
+
+def _own_text_(node):
+    # Text of an element without child elements, like the .string of bs4.
+    if node.child is None or (node.child.tag == "-text" and node.child.next is None):
+        return node.text()
+    return None
+
+
+class SelectolaxExtractor(HtmlExtractor):
+    name = "selectolax"
+    module = "selectolax.lexbor"
+
+    def _parse_(self, html):
+        from selectolax.lexbor import LexborHTMLParser
+        return LexborHTMLParser(html)
+
+    def get_dependency_hrefs(self, html):
+        tree = self._parse_(html)
+        return [node.attributes.get("href") for node in tree.css("a[data-octo-click='dep_graph_package']")]
+
+    def get_cve_numbers(self, html):
+        cve_numbers = []
+        for node in self._parse_(html).css("a"):
+            text = _own_text_(node)
+            if text and CVE_NUMBER_REGEX.search(text):
+                cve_numbers.append(text.strip())
+
+        return cve_numbers
+
+    def get_cve_record(self, html):
+        tree = self._parse_(html)
+        record_date = None
+        for node in tree.css("b"):
+            text = _own_text_(node)
+            if text and RECORD_DATE_REGEX.search(text):
+                record_date = text.strip()
+                break
+
+        return record_date, [node.attributes.get("href") for node in tree.css("li a[target='_blank']")]
+
+    def get_huntr_reported_on(self, html):
+        found = False
+        for node in self._parse_(html).css("p"):
+            if found:
+                return node.text().strip()
+            found = _own_text_(node) == "Reported on"
+
+        return None
+
+    def get_relative_time(self, html, attribute):
+        node = self._parse_(html).css_first("relative-time")
+        return node.attributes.get(attribute) if node is not None else None
+
+
+def _lxml_own_text_(element):
+    if len(element):
+        return None
+    return element.text or ""
+
+
+class LxmlExtractor(HtmlExtractor):
+    name = "lxml"
+    module = "lxml.html"
+
+    def _parse_(self, html):
+        import lxml.html
+        return lxml.html.fromstring(html)
+
+    def get_dependency_hrefs(self, html):
+        root = self._parse_(html)
+        return root.xpath("//a[@data-octo-click='dep_graph_package']/@href")
+
+    def get_cve_numbers(self, html):
+        cve_numbers = []
+        for element in self._parse_(html).iter("a"):
+            text = _lxml_own_text_(element)
+            if text and CVE_NUMBER_REGEX.search(text):
+                cve_numbers.append(text.strip())
+
+        return cve_numbers
+
+    def get_cve_record(self, html):
+        root = self._parse_(html)
+        record_date = None
+        for element in root.iter("b"):
+            text = _lxml_own_text_(element)
+            if text and RECORD_DATE_REGEX.search(text):
+                record_date = text.strip()
+                break
+
+        return record_date, root.xpath("//li//a[@target='_blank']/@href")
+
+    def get_huntr_reported_on(self, html):
+        found = False
+        for element in self._parse_(html).iter("p"):
+            if found:
+                return element.text_content().strip()
+            found = _lxml_own_text_(element) == "Reported on"
+
+        return None
+
+    def get_relative_time(self, html, attribute):
+        for element in self._parse_(html).iter("relative-time"):
+            return element.get(attribute)
+
+        return None
+
+
+_TAG_REGEX_ = re.compile(r"<(/?)([a-zA-Z][\w-]*)((?:[^>\"']|\"[^\"]*\"|'[^']*')*)>")
+_ATTRIBUTE_REGEX_ = re.compile(r"([^\s=/>]+)(?:\s*=\s*(?:\"([^\"]*)\"|'([^']*)'|([^\s>]+)))?")
+_ELEMENT_TEXT_REGEX_ = {name: re.compile(rf"<{name}\b[^>]*>([^<]*)</{name}\s*>", re.IGNORECASE)
+                        for name in ("a", "b")}
+_P_REGEX_ = re.compile(r"<p\b[^>]*>(.*?)</p\s*>", re.IGNORECASE | re.DOTALL)
+_STRIP_TAGS_REGEX_ = re.compile(r"<[^>]*>")
+
+
+def _parse_attributes_(text):
+    attributes = {}
+    for match in _ATTRIBUTE_REGEX_.finditer(text):
+        value = next((group for group in match.groups()[1:] if group is not None), "")
+        attributes.setdefault(match.group(1).lower(), html_.unescape(value))
+
+    return attributes
+
+
+class RegexExtractor(HtmlExtractor):
+    name = "regex"
+
+    def get_dependency_hrefs(self, html):
+        hrefs = []
+        for match in _TAG_REGEX_.finditer(html):
+            if match.group(1) or match.group(2).lower() != "a" or "dep_graph_package" not in match.group(3):
+                continue
+            attributes = _parse_attributes_(match.group(3))
+            if attributes.get("data-octo-click") == "dep_graph_package":
+                hrefs.append(attributes.get("href"))
+
+        return hrefs
+
+    def get_cve_numbers(self, html):
+        cve_numbers = []
+        for match in _ELEMENT_TEXT_REGEX_["a"].finditer(html):
+            text = html_.unescape(match.group(1))
+            if CVE_NUMBER_REGEX.search(text):
+                cve_numbers.append(text.strip())
+
+        return cve_numbers
+
+    def get_cve_record(self, html):
+        record_date = None
+        for match in _ELEMENT_TEXT_REGEX_["b"].finditer(html):
+            text = html_.unescape(match.group(1))
+            if RECORD_DATE_REGEX.search(text):
+                record_date = text.strip()
+                break
+
+        # Anchors opening a new window inside list items, the depth of open <li> elements is tracked.
+        references = []
+        li_depth = 0
+        for match in _TAG_REGEX_.finditer(html):
+            closing, tag = match.group(1), match.group(2).lower()
+            if tag == "li":
+                li_depth = max(li_depth - 1, 0) if closing else li_depth + 1
+            elif tag == "a" and not closing and li_depth and "_blank" in match.group(3):
+                attributes = _parse_attributes_(match.group(3))
+                if attributes.get("target") == "_blank":
+                    references.append(attributes.get("href"))
+
+        return record_date, references
+
+    def get_huntr_reported_on(self, html):
+        found = False
+        for match in _P_REGEX_.finditer(html):
+            text = match.group(1)
+            if found:
+                return html_.unescape(_STRIP_TAGS_REGEX_.sub("", text)).strip()
+            found = "<" not in text and html_.unescape(text) == "Reported on"
+
+        return None
+
+    def get_relative_time(self, html, attribute):
+        for match in _TAG_REGEX_.finditer(html):
+            if not match.group(1) and match.group(2).lower() == "relative-time":
+                return _parse_attributes_(match.group(3)).get(attribute)
+
+        return None
+
+
+# Backends by name, in order of preference, the ones whose parser is not installed are left out.
+BACKENDS = {extractor.name: extractor for extractor in [
+    SelectolaxExtractor(), LxmlExtractor(), RegexExtractor(), Bs4Extractor()
+] if extractor.module is None or importlib.util.find_spec(extractor.module) is not None}
+
+_HTML_EXTRACTOR = None
+
+
+def get_html_extractor():
+    global _HTML_EXTRACTOR
+    if _HTML_EXTRACTOR is None:
+        name = os.getenv("OSS_HTML_BACKEND")
+        if name and name not in BACKENDS:
+            raise ValueError(f"HTML backend {name} is not available, choose from {list(BACKENDS)}.")
+        _HTML_EXTRACTOR = BACKENDS[name] if name else next(iter(BACKENDS.values()))
+
+    return _HTML_EXTRACTOR
@@ -0,0 +1,165 @@
+"""
+
+Persistent cache of HTTP responses revalidated with conditional requests.
+
+Responses carrying an ETag or a Last-Modified header are kept on disk, keyed
+by method, url, Accept header and authorization scope (authenticated or
+anonymous, whichever token of the pool sent the request). The next request
+for the same key sends If-None-Match / If-Modified-Since, and a 304 response
+is answered from the cache. GitHub does not count 304 responses against the
+rate limit, so re-scoring unchanged repositories costs little quota. The
+cache is bounded in size and evicts the least recently used responses.
+
+"""
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+
+from constants import HTTP_CACHE_PATH, HTTP_CACHE_MAX_SIZE
+
+_SCHEMA_ = """
+create table if not exists response (
+    key text primary key,
+    url text not null,
+    etag text,
+    last_modified text,
+    headers text not null,
+    body blob not null,
+    size integer not null,
+    accessed_at real not null
+);
+create index if not exists response_accessed_at on response (accessed_at);
+"""
+
+# Headers describing the transfer of the stored body rather than the body itself.
+_TRANSFER_HEADERS_ = {"content-encoding", "content-length", "transfer-encoding", "connection", "keep-alive"}
+
+# Check the size of the cache every so many stores.
+_EVICTION_INTERVAL_ = 100
+
+
+class CachedResponse:
+
+    def __init__(self, url, etag, last_modified, headers, body):
+        self.url = url
+        self.etag = etag
+        self.last_modified = last_modified
+        self.headers = headers
+        self.body = body
+
+    # Headers making the request conditional on the cached response.
+    @property
+    def conditional_headers(self):
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+
+        return headers
+
+
+class HttpCache:
+
+    def __init__(self, path=HTTP_CACHE_PATH, max_size=HTTP_CACHE_MAX_SIZE):
+        self._max_size = max_size
+        self._lock = threading.Lock()
+        self._store_count = 0
+        os.makedirs(path, exist_ok=True)
+        # Worker processes of a batch share the file, so wait for their writes.
+        self._connection = sqlite3.connect(os.path.join(path, "responses.sqlite3"), timeout=60,
+                                           check_same_thread=False)
+        self._connection.execute("pragma journal_mode = wal")
+        self._connection.executescript(_SCHEMA_)
+
+    def close(self):
+        self._connection.close()
+
+    # Key of a request. Tokens rotate on every request, so the key only tells authenticated requests from
+    # anonymous ones, which do not see the same resources, and not the token sending them.
+    @staticmethod
+    def get_key(method, url, headers=None):
+        headers = {name.lower(): value for name, value in (headers or {}).items()}
+        scope = "authenticated" if headers.get("authorization") else "anonymous"
+        key = "\n".join([method.upper(), url, headers.get("accept", ""), scope])
+        return hashlib.sha256(key.encode()).hexdigest()
+
+    # Return the CachedResponse of the key, or None.
+    def get(self, key):
+        with self._lock:
+            row = self._connection.execute("select url, etag, last_modified, headers, body from response "
+                                           "where key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+
+        url, etag, last_modified, headers, body = row
+        return CachedResponse(url, etag, last_modified, json.loads(headers), bytes(body))
+
+    # Mark the response as used, it is evicted last.
+    def touch(self, key):
+        with self._lock, self._connection:
+            self._connection.execute("update response set accessed_at = ? where key = ?", (time.time(), key))
+
+    # Store a 200 response, responses without validators can not be revalidated and are skipped.
+    def put(self, key, url, headers, body):
+        headers = {name.lower(): value for name, value in headers.items()
+                   if name.lower() not in _TRANSFER_HEADERS_}
+        etag = headers.get("etag")
+        last_modified = headers.get("last-modified")
+        if not etag and not last_modified:
+            return False
+
+        with self._lock, self._connection:
+            self._connection.execute("insert or replace into response values (?, ?, ?, ?, ?, ?, ?, ?)",
+                                     (key, url, etag, last_modified, json.dumps(headers), body, len(body),
+                                      time.time()))
+            self._store_count += 1
+            if self._store_count % _EVICTION_INTERVAL_ == 0:
+                self._evict_()
+
+        return True
+
+    def _evict_(self):
+        size = self._connection.execute("select coalesce(sum(size), 0) from response").fetchone()[0]
+        if size <= self._max_size:
+            return
+
+        # Evict down to 90% of the bound, so eviction does not run on every store.
+        target = self._max_size * 0.9
+        rows = self._connection.execute("select key, size from response order by accessed_at")
+        keys = []
+        for key, response_size in rows:
+            if size <= target:
+                break
+            keys.append((key,))
+            size -= response_size
+
+        self._connection.executemany("delete from response where key = ?", keys)
+
+    @property
+    def size(self):
+        with self._lock:
+            return self._connection.execute("select coalesce(sum(size), 0) from response").fetchone()[0]
+
+
+_HTTP_CACHE = None
+_HTTP_CACHE_LOCK = threading.Lock()
+
+
+# Return the HTTP cache, or None if it is disabled with OSS_HTTP_CACHE=0.
+def get_http_cache():
+    global _HTTP_CACHE
+    if os.getenv("OSS_HTTP_CACHE") == "0":
+        return None
+
+    if _HTTP_CACHE is None:
+        with _HTTP_CACHE_LOCK:
+            if _HTTP_CACHE is None:
+                max_size = int(os.getenv("HTTP_CACHE_MAX_SIZE", HTTP_CACHE_MAX_SIZE))
+                _HTTP_CACHE = HttpCache(os.getenv("HTTP_CACHE_PATH", HTTP_CACHE_PATH), max_size)
+
+    return _HTTP_CACHE
@@ -0,0 +1,241 @@
+"""
+
+Record and replay of the HTTP traffic of the estimator.
+
+With OSS_RECORD_PATH set, the transport appends every request it sends and
+the response it gets to a fixture archive (gzip compressed JSON lines,
+authorization and API keys left out). Requests are keyed without the
+timestamps they carry, which are computed from the clock, so an archive
+replays on any day. The replay server answers requests from an archive on
+localhost, with a configurable latency and GitHub rate limit headers of its
+own, and the transport sends every request to it when OSS_REPLAY_URL is set.
+Benchmarks then run without GitHub, NVD or cve.mitre.org.
+
+Usage: python http_replay.py fixtures.jsonl.gz [--port 8080] [--latency 0.05] [--rate-limit 5000]
+
+"""
+
+import re
+import sys
+import gzip
+import json
+import time
+import base64
+import hashlib
+import argparse
+import threading
+import collections
+import urllib.parse
+import http.server
+
+# Header carrying the scheme and host the request was meant for, the path and query are kept.
+REPLAY_ORIGIN_HEADER = "X-Replay-Origin"
+# Set on responses to requests the archive has no response for.
+REPLAY_MISS_HEADER = "X-Replay-Miss"
+
+# Query parameters holding secrets, they are not part of the key and not recorded.
+_SECRET_PARAMS_ = {"apikey", "access_token", "client_secret"}
+# Headers describing the transfer of the recorded body or the recording session.
+_SKIPPED_HEADERS_ = {"content-encoding", "content-length", "transfer-encoding", "connection", "keep-alive",
+                     "set-cookie"}
+_RATE_LIMIT_HEADERS_ = {"x-ratelimit-limit", "x-ratelimit-remaining", "x-ratelimit-reset", "x-ratelimit-used",
+                        "x-ratelimit-resource"}
+# Timestamps sent as query parameters or GraphQL variables, computed from the clock at request time
+# (since=, commit_since...), they are not part of the key so an archive replays on another day.
+_TIMESTAMP_REGEX_ = re.compile(r"\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}(:\d{2}(\.\d+)?)?(Z|[+-]\d{2}:?\d{2})?\Z")
+_TIMESTAMP_ = "<timestamp>"
+
+
+def _normalize_value_(value):
+    if isinstance(value, str) and _TIMESTAMP_REGEX_.match(value):
+        return _TIMESTAMP_
+    if isinstance(value, dict):
+        return {name: _normalize_value_(item) for name, item in value.items()}
+    if isinstance(value, list):
+        return [_normalize_value_(item) for item in value]
+
+    return value
+
+
+def normalize_url(url):
+    parsed = urllib.parse.urlsplit(url)
+    query = sorted((name, _normalize_value_(value))
+                   for name, value in urllib.parse.parse_qsl(parsed.query, keep_blank_values=True)
+                   if name.lower() not in _SECRET_PARAMS_)
+    return urllib.parse.urlunsplit((parsed.scheme, parsed.netloc.lower(), parsed.path,
+                                    urllib.parse.urlencode(query), ""))
+
+
+# Key of a request, JSON bodies (GraphQL queries) are compared regardless of their formatting and timestamps.
+def get_fixture_key(method, url, body=None):
+    key = f"{method.upper()} {normalize_url(url)}"
+    if body:
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        try:
+            body = json.dumps(_normalize_value_(json.loads(body)), sort_keys=True).encode("utf-8")
+        except ValueError:
+            pass
+        key += " " + hashlib.sha256(body).hexdigest()[: 16]
+
+    return key
+
+
+class FixtureRecorder:
+
+    def __init__(self, path):
+        self._lock = threading.Lock()
+        self._file = gzip.open(path, "at", encoding="utf-8")
+
+    def record(self, method, url, body, response):
+        headers = {name.lower(): value for name, value in response.headers.items()
+                   if name.lower() not in _SKIPPED_HEADERS_}
+        entry = {
+            "key": get_fixture_key(method, url, body),
+            "status": response.status_code,
+            "headers": headers,
+            "body": base64.b64encode(response.content).decode("ascii")
+        }
+        with self._lock:
+            self._file.write(json.dumps(entry) + "\n")
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+# Return key -> recorded responses of the key, in the order they were recorded.
+def load_fixtures(path):
+    fixtures = collections.defaultdict(list)
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            entry = json.loads(line)
+            fixtures[entry["key"]].append((entry["status"], entry["headers"], base64.b64decode(entry["body"])))
+
+    return fixtures
+
+
+class ReplayServer(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, fixtures, port=0, latency=0.0, rate_limit=5000):
+        super().__init__(("127.0.0.1", port), _ReplayHandler_)
+        self.fixtures = fixtures
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.request_count = 0
+        self.miss_count = 0
+        self.misses = []
+        self._lock = threading.Lock()
+        # Position of the next response of each key, the last response of a key is repeated.
+        self._positions = collections.Counter()
+        # Authorization -> [remaining, reset] of the simulated GitHub rate limit.
+        self._budgets = {}
+        self._thread = None
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def next_response(self, key):
+        with self._lock:
+            self.request_count += 1
+            responses = self.fixtures.get(key)
+            if not responses:
+                self.miss_count += 1
+                self.misses.append(key)
+                return None
+
+            position = self._positions[key]
+            self._positions[key] = position + 1
+            return responses[min(position, len(responses) - 1)]
+
+    def get_rate_limit_headers(self, authorization, resource):
+        with self._lock:
+            now = int(time.time())
+            budget = self._budgets.get((authorization, resource))
+            if budget is None or budget[1] <= now:
+                budget = self._budgets[(authorization, resource)] = [self.rate_limit, now + 3600]
+            budget[0] = max(budget[0] - 1, 0)
+
+            return {
+                "x-ratelimit-limit": str(self.rate_limit),
+                "x-ratelimit-remaining": str(budget[0]),
+                "x-ratelimit-reset": str(budget[1]),
+                "x-ratelimit-used": str(self.rate_limit - budget[0]),
+                "x-ratelimit-resource": resource
+            }
+
+
+class _ReplayHandler_(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def _replay_(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else None
+        origin = self.headers.get(REPLAY_ORIGIN_HEADER, "")
+        key = get_fixture_key(self.command, origin + self.path, body)
+        if self.server.latency:
+            time.sleep(self.server.latency)
+
+        response = self.server.next_response(key)
+        if response is None:
+            self._send_(404, {REPLAY_MISS_HEADER.lower(): "1", "content-type": "text/plain"}, key.encode("utf-8"))
+            return
+
+        status, headers, content = response
+        headers = {name: value for name, value in headers.items() if name not in _RATE_LIMIT_HEADERS_}
+        if urllib.parse.urlsplit(origin).netloc == "api.github.com":
+            resource = "graphql" if self.path.startswith("/graphql") else "core"
+            headers.update(self.server.get_rate_limit_headers(self.headers.get("Authorization", ""), resource))
+
+        # Conditional requests are answered like GitHub does, without a body.
+        etag = headers.get("etag")
+        if status == 200 and etag and self.headers.get("If-None-Match") == etag:
+            status, content = 304, b""
+
+        self._send_(status, headers, content)
+
+    def _send_(self, status, headers, content):
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = do_HEAD = _replay_
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded HTTP traffic.")
+    parser.add_argument("archive", help="fixture archive recorded with OSS_RECORD_PATH")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument("--rate-limit", type=int, default=5000, help="GitHub rate limit of every token")
+    args = parser.parse_args()
+
+    server = ReplayServer(load_fixtures(args.archive), args.port, args.latency, args.rate_limit)
+    print(f"replaying {sum(map(len, server.fixtures.values()))} responses on {server.url}, "
+          f"set OSS_REPLAY_URL={server.url}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    server.server_close()
+
+
+if __name__ == "__main__":
+    main()
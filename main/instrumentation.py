@@ -0,0 +1,240 @@
+"""
+
+Per-metric instrumentation of scoring.
+
+Every public property of GitHubRepository is timed, and every request sent by
+the transport is counted by kind (REST, GraphQL, raw file, scraped page) with
+the bytes it transferred and the rate limit points it consumed. Work is
+attributed to the outermost metric being computed in the current context,
+which follows it into run_all and the dependency resolvers; inputs shared by
+several metrics are attributed to the input. collect() gathers the JSON
+summary of one repository, and summaries are aggregated into Prometheus
+counters for long-running batches.
+
+"""
+
+import re
+import time
+import inspect
+import threading
+import functools
+import contextlib
+import contextvars
+import urllib.parse
+
+REQUEST_KINDS = ("rest", "graphql", "raw", "scrape")
+# Scope of requests made outside of any metric, such as loading the repository.
+UNATTRIBUTED = "other"
+
+# Hosts answering with JSON, anything else but raw files is a scraped page.
+_API_HOSTS_ = {"api.github.com", "services.nvd.nist.gov", "bestpractices.coreinfrastructure.org"}
+
+# Cost of a GraphQL query, selected first so it is found at the start of the response.
+_GRAPHQL_COST_REGEX_ = re.compile(rb'"rateLimit"\s*:\s*\{\s*"cost"\s*:\s*(\d+)')
+
+_COLLECTOR = contextvars.ContextVar("collector", default=None)
+_SCOPE = contextvars.ContextVar("scope", default=None)
+
+
+def _new_stats_():
+    return {
+        "calls": 0,
+        "wall_time": 0.0,
+        "requests": dict.fromkeys(REQUEST_KINDS, 0),
+        "bytes_sent": 0,
+        "bytes_received": 0,
+        "rate_limit_points": {}
+    }
+
+
+def _merge_(target, source):
+    for name, value in source.items():
+        if isinstance(value, dict):
+            _merge_(target.setdefault(name, {}), value)
+        else:
+            target[name] = target.get(name, 0) + value
+
+
+class Collector:
+
+    def __init__(self):
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def _get_stats_(self, scope):
+        stats = self._stats.get(scope)
+        if stats is None:
+            stats = self._stats[scope] = _new_stats_()
+
+        return stats
+
+    def add_call(self, scope, wall_time):
+        with self._lock:
+            stats = self._get_stats_(scope)
+            stats["calls"] += 1
+            stats["wall_time"] += wall_time
+
+    def add_request(self, scope, kind, bytes_sent, bytes_received, resource=None, points=0):
+        with self._lock:
+            stats = self._get_stats_(scope)
+            stats["requests"][kind] += 1
+            stats["bytes_sent"] += bytes_sent
+            stats["bytes_received"] += bytes_received
+            if resource is not None:
+                stats["rate_limit_points"][resource] = stats["rate_limit_points"].get(resource, 0) + points
+
+    # Add a summary of another collector, to aggregate the repositories of a batch.
+    def merge(self, summary):
+        with self._lock:
+            for scope, stats in summary.items():
+                _merge_(self._get_stats_(scope), stats)
+
+    # Return scope -> stats, wall times rounded to the millisecond.
+    def summary(self):
+        with self._lock:
+            summary = {}
+            for scope in sorted(self._stats):
+                stats = _new_stats_()
+                _merge_(stats, self._stats[scope])
+                stats["wall_time"] = round(stats["wall_time"], 3)
+                summary[scope] = stats
+
+        return summary
+
+
+def is_collecting():
+    return _COLLECTOR.get() is not None
+
+
+# Collect the instrumentation of the work done in the block, yield the collector.
+@contextlib.contextmanager
+def collect():
+    collector = Collector()
+    token = _COLLECTOR.set(collector)
+    try:
+        yield collector
+    finally:
+        _COLLECTOR.reset(token)
+
+
+# Attribute the work done in the block to scope, unless it is already part of another scope.
+@contextlib.contextmanager
+def measure(scope):
+    collector = _COLLECTOR.get()
+    if collector is None or _SCOPE.get() is not None:
+        yield
+        return
+
+    token = _SCOPE.set(scope)
+    start_time = time.perf_counter()
+    try:
+        yield
+    finally:
+        collector.add_call(scope, time.perf_counter() - start_time)
+        _SCOPE.reset(token)
+
+
+def _measure_property_(name, fget):
+    @functools.wraps(fget)
+    def _get_(self):
+        # Nested properties and uncollected runs cost one context lookup.
+        if _SCOPE.get() is not None or _COLLECTOR.get() is None:
+            return fget(self)
+
+        with measure(name):
+            return fget(self)
+
+    return _get_
+
+
+# Class decorator timing the public properties of a repository class, the metrics among them.
+def instrument_properties(cls):
+    for name in dir(cls):
+        attribute = inspect.getattr_static(cls, name)
+        if name.startswith("_") or not isinstance(attribute, property) or attribute.fget is None:
+            continue
+        setattr(cls, name, property(_measure_property_(name, attribute.fget), attribute.fset, attribute.fdel,
+                                    attribute.__doc__))
+
+    return cls
+
+
+# Select the rate limit cost of a GraphQL query in its result, where record_request reads it.
+def select_graphql_cost(query):
+    position = query.index("{") + 1
+    return query[: position] + " rateLimit { cost }" + query[position:]
+
+
+def _get_rate_limit_points_(host, path, status_code, headers, content):
+    # GitHub reports the resource of each response, NVD has a single limit per API key.
+    if host == "api.github.com":
+        resource = headers.get("X-RateLimit-Resource") or ("graphql" if path == "/graphql" else "core")
+    elif host == "services.nvd.nist.gov":
+        resource = "nvd"
+    else:
+        return None, 0
+
+    # Conditional requests answered with 304 are free. GraphQL queries cost what their result reports, one
+    # point at least when they do not select it.
+    if status_code == 304:
+        return resource, 0
+    if path == "/graphql":
+        match = _GRAPHQL_COST_REGEX_.search(content, 0, 256)
+        return resource, max(int(match.group(1)), 1) if match else 1
+
+    return resource, 1
+
+
+# Record a request sent by the transport, url is the one meant, not the replay server.
+def record_request(url, body, response):
+    collector = _COLLECTOR.get()
+    if collector is None:
+        return
+
+    parsed = urllib.parse.urlsplit(url)
+    host = parsed.netloc.lower()
+    if host == "raw.githubusercontent.com":
+        kind = "raw"
+    elif host in _API_HOSTS_:
+        kind = "graphql" if host == "api.github.com" and parsed.path == "/graphql" else "rest"
+    else:
+        kind = "scrape"
+    if isinstance(body, str):
+        body = body.encode("utf-8")
+
+    resource, points = _get_rate_limit_points_(host, parsed.path, response.status_code, response.headers,
+                                               response.content)
+    collector.add_request(_SCOPE.get() or UNATTRIBUTED, kind, len(body or b""), len(response.content), resource,
+                          points)
+
+
+def _format_labels_(**labels):
+    return ",".join(f'{name}="{value}"' for name, value in labels.items())
+
+
+# Render a summary as Prometheus counters in the text exposition format.
+def format_prometheus(summary, prefix="oss"):
+    counters = [
+        (f"{prefix}_metric_calls_total", "Computations of each metric.", []),
+        (f"{prefix}_metric_seconds_total", "Wall time spent computing each metric.", []),
+        (f"{prefix}_http_requests_total", "Requests sent for each metric, by kind.", []),
+        (f"{prefix}_http_bytes_total", "Bytes transferred for each metric, by direction.", []),
+        (f"{prefix}_rate_limit_points_total", "Rate limit points consumed for each metric, by resource.", [])
+    ]
+    for scope, stats in summary.items():
+        counters[0][2].append((_format_labels_(metric=scope), stats["calls"]))
+        counters[1][2].append((_format_labels_(metric=scope), round(stats["wall_time"], 3)))
+        for kind, count in stats["requests"].items():
+            counters[2][2].append((_format_labels_(metric=scope, kind=kind), count))
+        counters[3][2].append((_format_labels_(metric=scope, direction="sent"), stats["bytes_sent"]))
+        counters[3][2].append((_format_labels_(metric=scope, direction="received"), stats["bytes_received"]))
+        for resource, points in sorted(stats["rate_limit_points"].items()):
+            counters[4][2].append((_format_labels_(metric=scope, resource=resource), points))
+
+    lines = []
+    for name, description, samples in counters:
+        lines.append(f"# HELP {name} {description}")
+        lines.append(f"# TYPE {name} counter")
+        lines.extend(f"{name}{{{labels}}} {value}" for labels, value in samples)
+
+    return "\n".join(lines) + "\n"
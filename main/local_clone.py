@@ -0,0 +1,122 @@
+"""
+
+Local git clone answering tree and file lookups without the GitHub API.
+
+A shallow bare clone of the default branch is fetched once under
+TEMP_REPOSITORY_PATH, or an existing bare mirror under LOCAL_MIRROR_PATH is
+used as is. Trees are listed with git ls-tree and blobs are read straight
+from the object store through one long-running git cat-file --batch.
+
+"""
+
+import os
+import shutil
+import threading
+import subprocess
+
+from constants import TEMP_REPOSITORY_PATH
+from exceptions import GitException
+from git_tree import TreeEntry, GitTreeSnapshot
+
+
+class LocalClone:
+
+    def __init__(self, path, temporary=False):
+        self.path = path
+        # Clones fetched into TEMP_REPOSITORY_PATH are removed with remove(), mirrors are kept.
+        self.temporary = temporary
+        self._lock = threading.Lock()
+        self._cat_file = None
+
+    def _git_(self, *args):
+        process = subprocess.run(["git", "--git-dir", self.path] + list(args), stdout=subprocess.PIPE,
+                                 stderr=subprocess.PIPE)
+        if process.returncode != 0:
+            raise GitException(args[0], process.stderr.decode("utf-8", "replace").strip())
+
+        return process.stdout
+
+    # Clone the branch of the repository into path, or update the clone already there.
+    @classmethod
+    def fetch(cls, clone_url, branch, path):
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            process = subprocess.run(["git", "clone", "--bare", "--quiet", "--depth", "1", "--single-branch",
+                                      "--branch", branch, clone_url, path], stdout=subprocess.PIPE,
+                                     stderr=subprocess.PIPE)
+            if process.returncode != 0:
+                shutil.rmtree(path, ignore_errors=True)
+                raise GitException("clone", process.stderr.decode("utf-8", "replace").strip())
+            return cls(path, temporary=True)
+
+        clone = cls(path, temporary=True)
+        clone._git_("fetch", "--quiet", "--depth", "1", clone_url, f"+refs/heads/{branch}:refs/heads/{branch}")
+        return clone
+
+    def get_head_sha(self, ref="HEAD"):
+        return self._git_("rev-parse", f"{ref}^{{commit}}").decode().strip()
+
+    def get_tree_snapshot(self, sha):
+        entries = []
+        output = self._git_("ls-tree", "-r", "-t", "-l", "-z", sha)
+        for record in output.split(b"\0"):
+            if not record:
+                continue
+            # <mode> <type> <sha> <size>\t<path>, size is "-" for trees and submodules.
+            info, _, path = record.partition(b"\t")
+            _, entry_type, entry_sha, size = info.decode().split()
+            entries.append(TreeEntry(path.decode("utf-8", "surrogateescape"), entry_type, entry_sha,
+                                     None if size == "-" else int(size)))
+
+        return GitTreeSnapshot(sha, entries)
+
+    # Return the content of a blob.
+    def read_blob(self, sha):
+        with self._lock:
+            if self._cat_file is None:
+                self._cat_file = subprocess.Popen(["git", "--git-dir", self.path, "cat-file", "--batch"],
+                                                  stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+            self._cat_file.stdin.write(sha.encode() + b"\n")
+            self._cat_file.stdin.flush()
+            header = self._cat_file.stdout.readline().decode().split()
+            if len(header) != 3:
+                raise GitException("cat-file", f"{sha} is missing")
+
+            content = self._cat_file.stdout.read(int(header[2]))
+            # Every object is followed by a newline.
+            self._cat_file.stdout.read(1)
+
+        return content
+
+    def read_text(self, sha):
+        return self.read_blob(sha).decode("utf-8", "replace")
+
+    def close(self):
+        with self._lock:
+            if self._cat_file is not None:
+                self._cat_file.stdin.close()
+                self._cat_file.wait()
+                self._cat_file = None
+
+    # Stop the cat-file process, and delete the clone unless it is a mirror.
+    def remove(self):
+        self.close()
+        if self.temporary:
+            shutil.rmtree(self.path, ignore_errors=True)
+
+
+# Return a LocalClone of the branch, from the mirror if there is one, otherwise fetched into TEMP_REPOSITORY_PATH.
+def open_local_clone(full_name, clone_url, branch):
+    mirror_path = os.getenv("LOCAL_MIRROR_PATH")
+    if mirror_path:
+        path = os.path.join(mirror_path, *full_name.split("/")) + ".git"
+        if os.path.exists(path):
+            return LocalClone(path)
+
+    path = os.path.join(TEMP_REPOSITORY_PATH, *full_name.split("/")) + ".git"
+    return LocalClone.fetch(clone_url, branch, path)
+
+
+# Remove the clones fetched into TEMP_REPOSITORY_PATH.
+def remove_local_clones():
+    shutil.rmtree(TEMP_REPOSITORY_PATH, ignore_errors=True)
@@ -0,0 +1,90 @@
+"""
+
+Snapshot of the recent commits on the default branch with their pull request,
+reviews, statuses and check runs, fetched with a single GraphQL query.
+
+"""
+
+import collections
+
+LOOK_BACK_COMMITS = 30
+
+# pull_request is None for commits not associated with any pull request, string fields are lower case.
+RecentCommit = collections.namedtuple("RecentCommit", ["sha", "author_login", "pull_request", "statuses",
+                                                       "check_runs"])
+PullRequest = collections.namedtuple("PullRequest", ["number", "author_login", "approved_review_count"])
+Status = collections.namedtuple("Status", ["state", "context", "target_url"])
+CheckRun = collections.namedtuple("CheckRun", ["app_slug", "name", "status", "conclusion"])
+
+_RECENT_COMMITS_QUERY_ = """
+query($owner:String!, $name:String!, $count:Int!) {
+  repository(owner:$owner, name:$name) {
+    defaultBranchRef {
+      target {
+        ... on Commit {
+          history(first:$count) {
+            nodes {
+              oid
+              author { user { login } }
+              associatedPullRequests(first:1) {
+                nodes {
+                  number
+                  author { login }
+                  reviews(states:APPROVED) { totalCount }
+                }
+              }
+              status { contexts { state context targetUrl } }
+              checkSuites(first:20) {
+                nodes {
+                  app { slug }
+                  checkRuns(first:50) { nodes { name status conclusion } }
+                }
+              }
+            }
+          }
+        }
+      }
+    }
+  }
+}
+"""
+
+
+def _lower_(value):
+    return value.lower() if value else ""
+
+
+def _parse_commit_(node):
+    author_user = (node.get("author") or {}).get("user") or {}
+
+    pull_request = None
+    pull_nodes = (node.get("associatedPullRequests") or {}).get("nodes") or []
+    if pull_nodes:
+        pull_node = pull_nodes[0]
+        pull_request = PullRequest(pull_node["number"], (pull_node.get("author") or {}).get("login", ""),
+                                   pull_node["reviews"]["totalCount"])
+
+    statuses = []
+    for context in (node.get("status") or {}).get("contexts") or []:
+        statuses.append(Status(_lower_(context["state"]), context["context"] or "", context["targetUrl"] or ""))
+
+    check_runs = []
+    for check_suite in (node.get("checkSuites") or {}).get("nodes") or []:
+        app_slug = (check_suite.get("app") or {}).get("slug", "")
+        for check_run in check_suite["checkRuns"]["nodes"]:
+            check_runs.append(CheckRun(app_slug, check_run["name"], _lower_(check_run["status"]),
+                                       _lower_(check_run["conclusion"])))
+
+    return RecentCommit(node["oid"], author_user.get("login", ""), pull_request, tuple(statuses), tuple(check_runs))
+
+
+# Return RecentCommit records of the latest commits on the default branch, newest first.
+def get_recent_commits(full_name, request_graphql, count=LOOK_BACK_COMMITS):
+    owner, name = full_name.split("/")
+    result = request_graphql(_RECENT_COMMITS_QUERY_, {"owner": owner, "name": name, "count": count})
+    default_branch_ref = result["data"]["repository"]["defaultBranchRef"]
+    if not default_branch_ref:
+        # Empty repository.
+        return []
+
+    return [_parse_commit_(node) for node in default_branch_ref["target"]["history"]["nodes"]]
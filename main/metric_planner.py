@@ -0,0 +1,231 @@
+"""
+
+Planner computing only the requested metrics of a repository.
+
+Every metric declares the shared inputs it reads (tree snapshot, workflows,
+CVE numbers, contributors...). Given the requested metrics, the planner
+orders the inputs they need by their dependencies, fetches each input exactly
+once, independent inputs concurrently, and then runs the metrics
+concurrently on the warmed repository.
+
+Metrics also declare the fingerprints of the data they are derived from
+(default branch head, releases, CVE data versions). A scorecard
+records its fingerprints, and an incremental run only recomputes the metrics
+whose fingerprints changed since the previous scorecard.
+
+"""
+
+import functools
+
+from transport import run_all, call_catching
+from instrumentation import measure
+from nvd_store import get_nvd_store
+from cve_index import get_cve_index
+
+
+class MetricInput:
+
+    def __init__(self, name, dependencies, fetch):
+        self.name = name
+        self.dependencies = dependencies
+        self.fetch = fetch
+
+
+INPUTS = {metric_input.name: metric_input for metric_input in [
+    MetricInput("tree_snapshot", (), lambda repo: repo._get_tree_snapshot_()),
+    MetricInput("workflows", ("tree_snapshot",), lambda repo: repo._get_workflow_store_()),
+    MetricInput("dependencies", (), lambda repo: repo.dependency_count),
+    MetricInput("dependency_vulnerabilities", ("dependencies",), lambda repo: repo.dependency_vulnerabilities),
+    MetricInput("created_since", (), lambda repo: repo.created_since),
+    MetricInput("contributors", (), lambda repo: repo._get_contributors_()),
+    MetricInput("top_contributors", (), lambda repo: repo._get_top_contributors_()),
+    MetricInput("recent_commits", (), lambda repo: repo._get_recent_commits_()),
+    MetricInput("cve_numbers", (), lambda repo: repo.history_vulnerability_count),
+    MetricInput("cve_records", ("cve_numbers",),
+                lambda repo: repo._get_cve_records_(repo._vulnerability_cve_numbers)),
+    MetricInput("unfixed_cve_numbers", ("cve_records", "contributors"), lambda repo: repo.unfixed_vulnerability_count)
+]}
+
+# Inputs which are a part of another input, the top contributors are the first page of all contributors.
+SUBSUMED_INPUTS = {
+    "top_contributors": "contributors"
+}
+
+# Inputs read by each metric, metrics not listed only read repository fields.
+METRIC_INPUTS = {
+    "created_since": ("created_since",),
+    "dependency_count": ("dependencies",),
+    "history_vulnerability_count": ("cve_numbers",),
+    "unfixed_vulnerability_count": ("unfixed_cve_numbers",),
+    "dependency_vulnerability_count": ("dependency_vulnerabilities",),
+    "history_vulnerability_severity": ("cve_numbers",),
+    "unfixed_vulnerability_severity": ("unfixed_cve_numbers",),
+    "release_count": ("created_since",),
+    "vulnerability_fix_timeliness": ("cve_records", "unfixed_cve_numbers"),
+    "outside_contributor_count": ("contributors",),
+    "organization_count": ("top_contributors",),
+    "contributor_capacity": ("contributors",),
+    "binary_artifact": ("tree_snapshot",),
+    "ci_test": ("recent_commits",),
+    "code_review": ("recent_commits",),
+    "dangerous_workflow": ("workflows",),
+    "dependency_update_tool": ("tree_snapshot",),
+    "fuzzing": ("tree_snapshot",),
+    "packaging": ("workflows",),
+    "sast": ("recent_commits", "workflows"),
+    "security_polity": ("tree_snapshot",),
+    "token_permission": ("workflows",),
+    "community_standards": ("tree_snapshot",)
+}
+
+
+def _get_version_(store):
+    # Without the local data the metric is scraped live, so its inputs are unknown.
+    return store.version if store is not None else None
+
+
+# Cheap values which change whenever the data behind a metric may have changed, None when unknown.
+FINGERPRINTS = {
+    "head_sha": lambda repo: repo._get_head_sha_(),
+    "release_etag": lambda repo: repo._get_release_etag_(),
+    "cve_version": lambda repo: _get_version_(get_cve_index()),
+    "nvd_version": lambda repo: _get_version_(get_nvd_store())
+}
+
+# Fingerprints of each metric. Metrics not listed are always computed: they are cheap, depend on the current
+# time, or read data which changes without any fingerprint changing (issues, user profiles, check and workflow runs).
+METRIC_FINGERPRINTS = {
+    "dependency_count": ("head_sha",),
+    "history_vulnerability_count": ("cve_version",),
+    "dependency_vulnerability_count": ("head_sha", "cve_version"),
+    "history_vulnerability_severity": ("cve_version", "nvd_version"),
+    "commit_count": ("head_sha",),
+    "binary_artifact": ("head_sha",),
+    "dangerous_workflow": ("head_sha",),
+    "dependency_update_tool": ("head_sha",),
+    "fuzzing": ("head_sha",),
+    "security_polity": ("head_sha",),
+    "signed_release": ("release_etag",),
+    "token_permission": ("head_sha",),
+    "community_standards": ("head_sha",)
+}
+
+
+class MetricPlan:
+
+    def __init__(self, metric_names):
+        self.metric_names = list(dict.fromkeys(metric_names))
+        self.input_stages = self._get_input_stages_()
+
+    def _get_input_stages_(self):
+        # Collect the inputs needed by the metrics, with their dependencies.
+        needed = set()
+        pending = [name for metric_name in self.metric_names for name in METRIC_INPUTS.get(metric_name, ())]
+        while pending:
+            name = pending.pop()
+            if name not in needed:
+                needed.add(name)
+                pending.extend(INPUTS[name].dependencies)
+        # An input read from a larger one is not fetched on its own when the larger one is.
+        needed -= {name for name, larger in SUBSUMED_INPUTS.items() if larger in needed}
+
+        # Group inputs into stages, each stage only depends on the stages before it.
+        stages = []
+        done = set()
+        while len(done) < len(needed):
+            stage = sorted(name for name in needed - done if set(INPUTS[name].dependencies) <= done)
+            if not stage:
+                raise ValueError(f"Cyclic metric inputs: {sorted(needed - done)}")
+            stages.append(stage)
+            done.update(stage)
+
+        return stages
+
+    @property
+    def inputs(self):
+        return [name for stage in self.input_stages for name in stage]
+
+
+# Fetch an input, its requests are attributed to the input rather than to one of the metrics sharing it.
+def _fetch_input_(name, repo):
+    with measure(f"input:{name}"):
+        return INPUTS[name].fetch(repo)
+
+
+def _describe_(e):
+    return f"{type(e).__name__}: {e}"
+
+
+# Calculate the metrics of a repository, return (scorecard, errors) where errors maps failed metrics to messages.
+def run_plan(repo, plan):
+    input_errors = {}
+    for stage in plan.input_stages:
+        # Inputs depending on a failed input are not fetched.
+        runnable = []
+        for name in stage:
+            failed = [dependency for dependency in INPUTS[name].dependencies if dependency in input_errors]
+            if failed:
+                input_errors[name] = input_errors[failed[0]]
+            else:
+                runnable.append(name)
+
+        results = run_all([functools.partial(call_catching, _fetch_input_, name, repo) for name in runnable])
+        for name, (_, e) in zip(runnable, results):
+            if e is not None:
+                input_errors[name] = e
+
+    scorecard = {}
+    errors = {}
+    runnable = []
+    for metric_name in plan.metric_names:
+        failed = [name for name in METRIC_INPUTS.get(metric_name, ()) if name in input_errors]
+        if failed:
+            scorecard[metric_name] = None
+            errors[metric_name] = _describe_(input_errors[failed[0]])
+        else:
+            runnable.append(metric_name)
+
+    results = run_all([functools.partial(call_catching, getattr, repo, metric_name) for metric_name in runnable])
+    for metric_name, (value, e) in zip(runnable, results):
+        scorecard[metric_name] = value
+        if e is not None:
+            errors[metric_name] = _describe_(e)
+
+    return {metric_name: scorecard[metric_name] for metric_name in plan.metric_names}, errors
+
+
+# Return the fingerprints of the metrics, a fingerprint which can not be computed is None.
+def get_fingerprints(repo, metric_names):
+    names = sorted({name for metric_name in metric_names for name in METRIC_FINGERPRINTS.get(metric_name, ())})
+    with measure("fingerprints"):
+        results = run_all([functools.partial(call_catching, FINGERPRINTS[name], repo) for name in names])
+    return {name: value for name, (value, _) in zip(names, results)}
+
+
+# Return metrics of the previous scorecard which can be reused, they succeeded and their fingerprints are unchanged.
+def get_reusable_metrics(metric_names, fingerprints, previous):
+    previous_scorecard = previous.get("scorecard") or {}
+    previous_errors = previous.get("errors") or {}
+    previous_fingerprints = previous.get("fingerprints") or {}
+    reusable = {}
+    for metric_name in metric_names:
+        names = METRIC_FINGERPRINTS.get(metric_name)
+        if not names or metric_name not in previous_scorecard or metric_name in previous_errors:
+            continue
+        if all(fingerprints.get(name) is not None and fingerprints.get(name) == previous_fingerprints.get(name)
+               for name in names):
+            reusable[metric_name] = previous_scorecard[metric_name]
+
+    return reusable
+
+
+# Calculate the metrics, reusing the values of the previous record (scorecard, errors, fingerprints) when possible.
+# Fingerprints cost requests of their own, they are only computed with a previous record or fingerprint set.
+# Return (scorecard, errors, fingerprints or None, reused metric names).
+def run_incremental(repo, metric_names, previous=None, fingerprint=False):
+    fingerprints = get_fingerprints(repo, metric_names) if previous or fingerprint else None
+    reusable = get_reusable_metrics(metric_names, fingerprints, previous) if previous else {}
+    scorecard, errors = run_plan(repo, MetricPlan([name for name in metric_names if name not in reusable]))
+    scorecard.update(reusable)
+
+    return {name: scorecard[name] for name in dict.fromkeys(metric_names)}, errors, fingerprints, list(reusable)
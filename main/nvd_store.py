@@ -0,0 +1,154 @@
+"""
+
+Local NVD mirror built from the NVD JSON 1.1 data feeds.
+
+Yearly feeds (nvdcve-1.1-<year>.json.gz) are imported once, and the
+"modified" feed is applied on top of them incrementally. CVEs are indexed by
+CVE ID, by the GitHub repository their references point to and by reference
+type, so vulnerability metrics are answered without calling the NVD API.
+
+Usage: python nvd_store.py <feed.json.gz> [<feed.json.gz> ...]
+
+"""
+
+import os
+import sys
+import gzip
+import json
+import sqlite3
+import threading
+
+from constants import NVD_MIRROR_PATH
+from references import classify_reference, get_reference_repository
+
+_SCHEMA_ = """
+create table if not exists cve (
+    cve_id text primary key,
+    base_score real,
+    published_date text,
+    last_modified_date text
+);
+create table if not exists cve_reference (
+    cve_id text not null,
+    url text not null,
+    repository text,
+    reference_type text
+);
+create index if not exists cve_reference_cve_id on cve_reference (cve_id);
+create index if not exists cve_reference_repository on cve_reference (repository, reference_type);
+create table if not exists meta (
+    key text primary key,
+    value text
+);
+"""
+
+
+class NvdStore:
+
+    def __init__(self, path=NVD_MIRROR_PATH):
+        self._path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("pragma journal_mode = wal")
+        self._connection.execute("pragma mmap_size = 1073741824")
+        self._connection.executescript(_SCHEMA_)
+
+    def close(self):
+        self._connection.close()
+
+    def _query_(self, sql, params=()):
+        with self._lock:
+            return self._connection.execute(sql, params).fetchall()
+
+    # Version of the mirror, it changes whenever a feed modifies any CVE, None before the first one.
+    @property
+    def version(self):
+        rows = self._query_("select value from meta where key = 'version'")
+        return int(rows[0][0]) if rows else None
+
+    def __contains__(self, cve_number):
+        return bool(self._query_("select 1 from cve where cve_id = ?", (cve_number,)))
+
+    # CVSS v3 base scores of the CVEs in the mirror, None for CVEs without one.
+    def get_base_scores(self, cve_numbers):
+        base_scores = {}
+        for chunk in _chunks_(list(cve_numbers), 500):
+            placeholders = ",".join("?" * len(chunk))
+            for cve_id, base_score in self._query_(f"select cve_id, base_score from cve where cve_id in "
+                                                   f"({placeholders})", chunk):
+                base_scores[cve_id] = base_score
+
+        return base_scores
+
+    # Return CVE IDs with a reference to the GitHub repository, optionally of one reference type.
+    def get_cve_numbers(self, full_name, reference_type=None):
+        sql = "select distinct cve_id from cve_reference where repository = ?"
+        params = [full_name.lower()]
+        if reference_type:
+            sql += " and reference_type = ?"
+            params.append(reference_type)
+
+        return sorted(row[0] for row in self._query_(sql + " order by cve_id", params))
+
+    # Import a gzip (or plain) JSON feed, CVEs are only replaced by newer modifications.
+    def import_feed(self, feed_path):
+        opener = gzip.open if feed_path.endswith(".gz") else open
+        with opener(feed_path, "rt", encoding="utf-8") as f:
+            feed = json.load(f)
+
+        cve_rows = []
+        reference_rows = []
+        with self._lock:
+            known = dict(self._connection.execute("select cve_id, last_modified_date from cve"))
+            for item in feed.get("CVE_Items", []):
+                cve_id = item["cve"]["CVE_data_meta"]["ID"]
+                last_modified_date = item.get("lastModifiedDate")
+                if cve_id in known and known[cve_id] and last_modified_date and known[cve_id] >= last_modified_date:
+                    continue
+
+                base_score = item.get("impact", {}).get("baseMetricV3", {}).get("cvssV3", {}).get("baseScore")
+                cve_rows.append((cve_id, base_score, item.get("publishedDate"), last_modified_date))
+                for reference in item["cve"].get("references", {}).get("reference_data", []):
+                    url = reference.get("url", "")
+                    reference_rows.append((cve_id, url, get_reference_repository(url), classify_reference(url)))
+
+            with self._connection:
+                for chunk in _chunks_([(row[0],) for row in cve_rows], 500):
+                    self._connection.executemany("delete from cve_reference where cve_id = ?", chunk)
+                self._connection.executemany("insert or replace into cve values (?, ?, ?, ?)", cve_rows)
+                self._connection.executemany("insert into cve_reference values (?, ?, ?, ?)", reference_rows)
+                if cve_rows:
+                    self._connection.execute("insert into meta values ('version', '1') on conflict (key) do update "
+                                             "set value = cast(value as integer) + 1")
+
+        return len(cve_rows)
+
+
+def _chunks_(items, size):
+    for i in range(0, len(items), size):
+        yield items[i: i + size]
+
+
+_NVD_STORE = None
+
+
+# Return the local NVD mirror, or None if it has not been built.
+def get_nvd_store():
+    global _NVD_STORE
+    if _NVD_STORE is None:
+        path = os.getenv("NVD_MIRROR_PATH", NVD_MIRROR_PATH)
+        if not os.path.exists(path):
+            return None
+        _NVD_STORE = NvdStore(path)
+
+    return _NVD_STORE
+
+
+if __name__ == "__main__":
+    store = NvdStore(os.getenv("NVD_MIRROR_PATH", NVD_MIRROR_PATH))
+    for feed_file in sys.argv[1:]:
+        print(f"{feed_file}: {store.import_feed(feed_file)} CVEs imported")
+    store.close()
@@ -0,0 +1,53 @@
+"""
+
+Classification of vulnerability reference URLs by what they point to.
+
+"""
+
+import re
+
+COMMIT_REFERENCE = "commit"
+ISSUE_REFERENCE = "issue"
+PULL_REFERENCE = "pull"
+RELEASE_REFERENCE = "release"
+ADVISORY_REFERENCE = "advisory"
+HUNTR_REFERENCE = "huntr"
+
+REFERENCE_TYPES = (COMMIT_REFERENCE, ISSUE_REFERENCE, PULL_REFERENCE, RELEASE_REFERENCE, ADVISORY_REFERENCE,
+                   HUNTR_REFERENCE)
+
+# A single alternation, the named group that matched tells the reference type.
+REFERENCE_REGEX = re.compile(
+    r"https?://(?:www\.)?github\.com/(?P<repository>[\w.-]+/[\w.-]+)/"
+    r"(?:(?P<commit>commit)|(?P<issue>issues)|(?P<pull>pull)|(?P<release>releases)"
+    r"|(?P<advisory>security/advisories))"
+    r"|(?P<huntr>https?://(?:www\.)?huntr\.dev/bounties)",
+    re.IGNORECASE)
+
+GITHUB_REPOSITORY_REGEX = re.compile(r"https?://(?:www\.)?github\.com/([\w.-]+/[\w.-]+)", re.IGNORECASE)
+
+
+# Return "owner/repo" of a GitHub url in lower case, or None.
+def get_reference_repository(url):
+    match = GITHUB_REPOSITORY_REGEX.match(url)
+    if not match:
+        return None
+
+    repository = match.group(1).lower()
+    if repository.endswith(".git"):
+        repository = repository[: -4]
+
+    return repository
+
+
+# Return the reference type of the url, or None if it is none of REFERENCE_TYPES.
+def classify_reference(url):
+    match = REFERENCE_REGEX.search(url)
+    if not match:
+        return None
+
+    for reference_type in REFERENCE_TYPES:
+        if match.group(reference_type):
+            return reference_type
+
+    return None
@@ -9,9 +9,24 @@ class Repository:
 
     def __init__(self, repo):
         self._repo = repo
-        self._dependencies = []
-        self._vulnerability_cve_numbers = []
-        self._unfixed_vulnerability_numbers = []
+        self._dependencies = None
+        self._dependency_vulnerabilities = None
+        self._vulnerability_cve_numbers = None
+        self._unfixed_vulnerability_numbers = None
+        self._contributors = None
+        self._top_contributors = None
+        self._created_since = None
+        self._cve_records = {}
+        self._cvss_base_scores = {}
+        self._tree_snapshot = None
+        self._workflow_store = None
+        self._recent_commits = None
+        self._local_clone = None
+        self._head_sha = None
+
+    # Release the local resources of the repository.
+    def close(self):
+        pass
 
     @property
     def name(self):
@@ -61,6 +76,10 @@ class Repository:
     def dependency_vulnerability_count(self):
         raise NotImplementedError
 
+    @property
+    def dependency_vulnerabilities(self):
+        raise NotImplementedError
+
     @property
     def history_vulnerability_severity(self):
         raise NotImplementedError
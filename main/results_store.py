@@ -0,0 +1,221 @@
+"""
+
+SQLite store of scorecards, one row per repository per run.
+
+The scorecard table has a typed column for every metric of PARAMS, so the
+latest scores, the history of a repository and the repositories whose metric
+dropped between two runs are answered by indexed queries, row by row,
+without loading every result.
+
+Usage: python results_store.py latest
+       python results_store.py history https://github.com/ossf/scorecard
+       python results_store.py drops ci_test [--run-id 2022-05-02 --previous-run-id 2022-05-01]
+       python results_store.py import ../results/scorecards.jsonl
+
+"""
+
+import os
+import sys
+import json
+import sqlite3
+import argparse
+import threading
+
+from constants import RESULTS_STORE_PATH
+
+# Metrics holding text, the other metrics are numbers.
+TEXT_METRICS = {"name", "description", "main_language"}
+
+# Columns describing the run, the metric columns follow them.
+RECORD_COLUMNS = [
+    ("run_id", "text not null"),
+    ("url", "text not null"),
+    ("status", "text not null"),
+    ("finished_at", "text"),
+    ("elapsed", "real"),
+    ("error", "text"),
+    ("errors", "text"),
+    ("fingerprints", "text")
+]
+
+_INDEXES_ = """
+create index if not exists scorecard_url on scorecard (url, finished_at);
+create index if not exists scorecard_run_id on scorecard (run_id);
+"""
+
+
+def get_metric_columns(params):
+    columns = []
+    for metric_names in params.values():
+        for metric_name in metric_names:
+            columns.append((metric_name, "text" if metric_name in TEXT_METRICS else "real"))
+
+    return columns
+
+
+def _to_column_(value):
+    if value is None or isinstance(value, (int, float, str)):
+        return value
+
+    return json.dumps(value, default=str)
+
+
+class ResultsStore:
+
+    def __init__(self, params, path=RESULTS_STORE_PATH):
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connection = sqlite3.connect(path, timeout=60, check_same_thread=False)
+        self._connection.row_factory = sqlite3.Row
+        self._connection.execute("pragma journal_mode = wal")
+        self.metric_names = [name for name, _ in get_metric_columns(params)]
+        self._create_schema_(params)
+
+    def _create_schema_(self, params):
+        columns = RECORD_COLUMNS + get_metric_columns(params)
+        definitions = ", ".join(f'"{name}" {column_type}' for name, column_type in columns)
+        with self._connection:
+            self._connection.execute(f"create table if not exists scorecard ({definitions}, "
+                                     f"primary key (run_id, url))")
+            # Metrics added to PARAMS since the table was created.
+            existing = {row["name"] for row in self._connection.execute("pragma table_info(scorecard)")}
+            for name, column_type in columns:
+                if name not in existing:
+                    self._connection.execute(f'alter table scorecard add column "{name}" {column_type}')
+            self._connection.executescript(_INDEXES_)
+
+    def close(self):
+        self._connection.close()
+
+    # Insert a batch record, a record of the same repository and run replaces the previous one.
+    def add_record(self, record):
+        self.add_records([record])
+
+    def add_records(self, records):
+        names = [name for name, _ in RECORD_COLUMNS] + self.metric_names
+        rows = []
+        for record in records:
+            scorecard = record.get("scorecard") or {}
+            row = [record["run_id"], record["url"], record["status"], record.get("finished_at"),
+                   record.get("elapsed"), record.get("error"), json.dumps(record.get("errors") or {}),
+                   json.dumps(record.get("fingerprints") or {})]
+            row.extend(_to_column_(scorecard.get(name)) for name in self.metric_names)
+            rows.append(row)
+
+        columns = ", ".join(f'"{name}"' for name in names)
+        placeholders = ", ".join("?" * len(names))
+        with self._lock, self._connection:
+            self._connection.executemany(f"insert or replace into scorecard ({columns}) values ({placeholders})",
+                                         rows)
+
+    def _iterate_(self, sql, params=()):
+        # Rows are yielded as they are read, the cursor is not shared with other threads.
+        cursor = self._connection.cursor()
+        cursor.execute(sql, params)
+        for row in cursor:
+            yield dict(row)
+
+    # Return the run IDs, which are free-form, in the order the runs finished.
+    def get_run_ids(self):
+        return [row["run_id"] for row in self._iterate_("select run_id from scorecard group by run_id "
+                                                        "order by max(finished_at), run_id")]
+
+    # Yield the latest successful row of each repository.
+    def get_latest(self):
+        columns = ", ".join(f'"{name}"' for name in [name for name, _ in RECORD_COLUMNS] + self.metric_names)
+        return self._iterate_(f"select {columns} from (select *, row_number() over (partition by url order by "
+                              f"finished_at desc, run_id desc) as rank from scorecard where status = 'ok') "
+                              f"where rank = 1 order by url")
+
+    # Yield the rows of a repository, oldest run first.
+    def get_history(self, url):
+        return self._iterate_("select * from scorecard where url = ? order by finished_at, run_id", (url,))
+
+    # Yield (url, previous value, value) of repositories whose metric dropped between two runs.
+    def get_drops(self, metric_name, run_id=None, previous_run_id=None):
+        if metric_name not in self.metric_names:
+            raise ValueError(f"Unknown metric: {metric_name}")
+
+        if run_id is None or previous_run_id is None:
+            # The previous run is the one finished last before the run.
+            run_ids = self.get_run_ids()
+            run_id = run_id or (run_ids[-1] if run_ids else None)
+            earlier_run_ids = run_ids[: run_ids.index(run_id)] if run_id in run_ids else []
+            previous_run_id = previous_run_id or (earlier_run_ids[-1] if earlier_run_ids else None)
+        if run_id is None or previous_run_id is None:
+            return iter(())
+
+        return self._iterate_(f'select current.url, previous."{metric_name}" as previous_value, '
+                              f'current."{metric_name}" as value from scorecard as current join scorecard as '
+                              f'previous on previous.url = current.url and previous.run_id = ? '
+                              f'where current.run_id = ? and current."{metric_name}" < previous."{metric_name}" '
+                              f'order by current.url', (previous_run_id, run_id))
+
+    # Import a JSON lines results file written by batch.py.
+    def import_results(self, results_file):
+        count = 0
+        records = []
+        with open(results_file, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    continue
+
+                if len(records) == 1000:
+                    self.add_records(records)
+                    count += len(records)
+                    records = []
+
+        self.add_records(records)
+        return count + len(records)
+
+
+_RESULTS_STORE = None
+
+
+def get_results_store(params):
+    global _RESULTS_STORE
+    if _RESULTS_STORE is None:
+        _RESULTS_STORE = ResultsStore(params, os.getenv("RESULTS_STORE_PATH", RESULTS_STORE_PATH))
+
+    return _RESULTS_STORE
+
+
+def _print_rows_(rows):
+    for row in rows:
+        print(json.dumps(row, default=str))
+
+
+def main():
+    from run import PARAMS
+
+    parser = argparse.ArgumentParser(description="Query the stored scorecards.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("latest", help="latest scorecard of each repository")
+    history_parser = subparsers.add_parser("history", help="scorecards of a repository")
+    history_parser.add_argument("url")
+    drops_parser = subparsers.add_parser("drops", help="repositories whose metric dropped between two runs")
+    drops_parser.add_argument("metric")
+    drops_parser.add_argument("--run-id", help="default: the latest run")
+    drops_parser.add_argument("--previous-run-id", help="default: the run before --run-id")
+    import_parser = subparsers.add_parser("import", help="import a JSON lines results file")
+    import_parser.add_argument("results_file")
+    args = parser.parse_args()
+
+    store = get_results_store(PARAMS)
+    if args.command == "latest":
+        _print_rows_(store.get_latest())
+    elif args.command == "history":
+        _print_rows_(store.get_history(args.url))
+    elif args.command == "drops":
+        _print_rows_(store.get_drops(args.metric, args.run_id, args.previous_run_id))
+    else:
+        print(f"{store.import_results(args.results_file)} records imported", file=sys.stderr)
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
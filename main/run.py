@@ -7,10 +7,7 @@ Main script for calculating open source software security score.
 import os
 
 from exceptions import *
-from github_repository import get_repository
-
-_CACHED_GITHUB_TOKEN = None
-_CACHED_GITHUB_TOKEN_OBJ = None
+from local_clone import remove_local_clones
 
 PARAMS = {
     "basic_information": [
@@ -39,11 +36,45 @@ PARAMS = {
 }
 
 
+# Return metric names of the given PARAMS categories, all categories by default.
+def get_metric_names(categories=None):
+    if not categories:
+        categories = PARAMS.keys()
+
+    metric_names = []
+    for category in categories:
+        if category not in PARAMS:
+            raise ValueError(f"Unknown PARAMS category: {category}")
+        metric_names.extend(PARAMS[category])
+
+    return metric_names
+
+
+# Calculate metrics of a repository, a failing metric is recorded in errors and does not stop the others.
+# Metrics of the previous record whose fingerprints are unchanged are reused, fingerprints are computed to be
+# recorded when fingerprint is set. Return (scorecard, errors, fingerprints, reused metric names).
+def score_repository(repo_url, metric_names, previous=None, fingerprint=False):
+    # PyGithub and requests are imported by the first repository scored, not by the command line of the batch.
+    from github_repository import get_repository
+    from metric_planner import run_incremental
+
+    repo = get_repository(repo_url)
+    if repo is None:
+        raise URLException(f"Repository {repo_url} does not exist.")
+
+    try:
+        return run_incremental(repo, metric_names, previous, fingerprint)
+    finally:
+        repo.close()
+
+
 def close():
-    os.system("rmdir /s /q ..\\temp_repository")
+    remove_local_clones()
 
 
 def main():
+    from github_repository import get_repository
+
     # init("https://github.com/microweber/microweber")
     repo_url = "https://github.com/ossf/scorecard"
     try:
@@ -0,0 +1,138 @@
+"""
+
+Pool of GitHub authorization tokens scheduled by their remaining rate limit.
+
+Rate limits are tracked per token and per bucket (core, search, graphql) from
+the X-RateLimit-* headers of responses, so no extra rate limit queries are
+made. A request takes the token with the largest remaining budget in its
+bucket, and only waits when every token of that bucket is exhausted.
+
+"""
+
+import time
+import asyncio
+import threading
+
+import github
+
+from constants import GITHUB_RATE_LIMIT_RESERVE, GITHUB_RATE_LIMITS
+
+CORE_BUCKET = "core"
+SEARCH_BUCKET = "search"
+GRAPHQL_BUCKET = "graphql"
+
+
+class TokenState:
+
+    def __init__(self, token):
+        self.token = token
+        self._github = None
+        # bucket -> [remaining, reset epoch seconds], remaining is the documented limit until a response is seen.
+        self.buckets = {bucket: [limit, 0] for bucket, limit in GITHUB_RATE_LIMITS.items()}
+
+    @property
+    def github(self):
+        if self._github is None:
+            self._github = github.Github(self.token)
+
+        return self._github
+
+    def available(self, bucket, now):
+        remaining, reset = self.buckets[bucket]
+        return remaining > GITHUB_RATE_LIMIT_RESERVE or reset <= now
+
+
+class TokenPool:
+
+    def __init__(self, tokens):
+        assert tokens, "At least one GitHub token is required."
+        self._tokens = [TokenState(token) for token in tokens]
+        self._by_token = {state.token: state for state in self._tokens}
+        self._condition = threading.Condition()
+
+    def __len__(self):
+        return len(self._tokens)
+
+    def _select_(self, bucket):
+        now = time.time()
+        best = None
+        for state in self._tokens:
+            if not state.available(bucket, now):
+                continue
+
+            if state.buckets[bucket][1] <= now:
+                # The window has been reset since the last response, so the budget is full again.
+                state.buckets[bucket] = [GITHUB_RATE_LIMITS[bucket], 0]
+
+            if best is None or state.buckets[bucket][0] > best.buckets[bucket][0]:
+                best = state
+
+        if best is not None:
+            # Spend one point now, the response headers will correct it. Windows last one hour.
+            budget = best.buckets[bucket]
+            budget[0] -= 1
+            if not budget[1]:
+                budget[1] = now + 3600
+
+        return best
+
+    def _wait_time_(self, bucket):
+        resets = [state.buckets[bucket][1] for state in self._tokens]
+        return max(min(resets) - time.time(), 0) + 1
+
+    # Return the TokenState to use for one request in the bucket, waiting only for that bucket if exhausted.
+    def acquire(self, bucket=CORE_BUCKET, block=True):
+        with self._condition:
+            while True:
+                state = self._select_(bucket)
+                if state is not None or not block:
+                    return state
+
+                self._condition.wait(self._wait_time_(bucket))
+
+    async def acquire_async(self, bucket=CORE_BUCKET):
+        while True:
+            state = self.acquire(bucket, block=False)
+            if state is not None:
+                return state
+
+            with self._condition:
+                wait_time = self._wait_time_(bucket)
+            await asyncio.sleep(wait_time)
+
+    # Record rate limit state from the headers of a response made with the token.
+    def update(self, token, headers):
+        state = self._by_token.get(token)
+        remaining = headers.get("X-RateLimit-Remaining")
+        reset = headers.get("X-RateLimit-Reset")
+        if state is None or remaining is None or reset is None:
+            return
+
+        bucket = headers.get("X-RateLimit-Resource", CORE_BUCKET)
+        if bucket not in state.buckets:
+            return
+
+        with self._condition:
+            state.buckets[bucket] = [int(remaining), int(reset)]
+            self._condition.notify_all()
+
+    # Record core rate limit state PyGithub has already read from its last response.
+    def update_from_github(self, state):
+        if state._github is None:
+            return
+
+        requester = getattr(state._github, "_Github__requester", None)
+        rate_limiting = getattr(requester, "rate_limiting", (-1, -1))
+        reset = getattr(requester, "rate_limiting_resettime", 0)
+        if rate_limiting[0] < 0:
+            return
+
+        with self._condition:
+            state.buckets[CORE_BUCKET] = [rate_limiting[0], int(reset)]
+            self._condition.notify_all()
+
+    def acquire_github(self):
+        for state in self._tokens:
+            self.update_from_github(state)
+
+        return self.acquire(CORE_BUCKET).github
@@ -0,0 +1,252 @@
+"""
+
+Shared HTTP transport, every outbound request of the estimator goes through it.
+
+Connections are pooled and kept alive per host, and the number of in-flight
+requests per host is bounded. Independent requests can be issued concurrently
+with fetch_all and run_all, which drive them from an asyncio event loop.
+GET requests made with cache=True are revalidated against the HTTP cache.
+Traffic is recorded to a fixture archive with OSS_RECORD_PATH, and sent to a
+replay server instead of the real hosts with OSS_REPLAY_URL. Every request
+is counted by the instrumentation of the metric which sent it.
+
+"""
+
+import os
+import json
+import asyncio
+import contextvars
+import threading
+import functools
+import urllib.parse
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+from constants import HTTP_POOL_SIZE, HTTP_HOST_CONCURRENCY, HTTP_HOST_CONCURRENCY_LIMITS, HTTP_TIMEOUT, \
+    RUN_ALL_CONCURRENCY
+from http_cache import HttpCache, get_http_cache
+from http_replay import REPLAY_ORIGIN_HEADER, FixtureRecorder
+from instrumentation import is_collecting, record_request
+
+
+class Transport:
+
+    def __init__(self, pool_size=HTTP_POOL_SIZE, host_concurrency=HTTP_HOST_CONCURRENCY,
+                 host_concurrency_limits=None, timeout=HTTP_TIMEOUT, http2=False, cache=None, replay_url=None,
+                 recorder=None):
+        self._timeout = timeout
+        self._cache = cache
+        self._replay_url = replay_url.rstrip("/") if replay_url else None
+        self._recorder = recorder
+        self._host_concurrency = host_concurrency
+        self._host_concurrency_limits = dict(HTTP_HOST_CONCURRENCY_LIMITS)
+        self._host_concurrency_limits.update(host_concurrency_limits or {})
+        self._host_semaphores = {}
+        self._lock = threading.Lock()
+        self._httpx = _import_httpx_() if http2 else None
+        self._http2 = self._httpx is not None
+        if self._http2:
+            limits = self._httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)
+            self._session = self._httpx.Client(http2=True, limits=limits, timeout=timeout)
+        else:
+            self._session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+            self._session.mount("http://", adapter)
+            self._session.mount("https://", adapter)
+
+    @property
+    def http2(self):
+        return self._http2
+
+    def _get_host_semaphore_(self, url):
+        host = urllib.parse.urlparse(url).netloc
+        semaphore = self._host_semaphores.get(host)
+        if semaphore is None:
+            with self._lock:
+                semaphore = self._host_semaphores.get(host)
+                if semaphore is None:
+                    limit = self._host_concurrency_limits.get(host, self._host_concurrency)
+                    semaphore = threading.BoundedSemaphore(limit)
+                    self._host_semaphores[host] = semaphore
+
+        return semaphore
+
+    def request(self, method, url, params=None, headers=None, json=None, data=None, cache=False):
+        if cache and method.upper() == "GET" and self._cache is not None:
+            return self._request_cached_(url, params, headers)
+
+        return self._request_(method, url, params=params, headers=headers, json=json, data=data)
+
+    def _request_(self, method, url, params=None, headers=None, json=None, data=None):
+        response = self._route_(method, url, params, headers, json, data)
+        if is_collecting():
+            record_request(url, _get_body_(json, data), response)
+
+        return response
+
+    def _route_(self, method, url, params, headers, json, data):
+        if self._replay_url is None and self._recorder is None:
+            return self._send_(method, url, params, headers, json, data)
+
+        url = _join_params_(url, params)
+        if self._recorder is not None:
+            response = self._send_(method, url, None, headers, json, data)
+            self._recorder.record(method, url, _get_body_(json, data), response)
+            return response
+
+        # The replay server gets the path and query, and the scheme and host in a header.
+        parsed = urllib.parse.urlsplit(url)
+        origin = f"{parsed.scheme}://{parsed.netloc}"
+        headers = dict(headers or {})
+        headers[REPLAY_ORIGIN_HEADER] = origin
+        return self._send_(method, self._replay_url + url[len(origin):], None, headers, json, data)
+
+    def _send_(self, method, url, params, headers, json, data):
+        kwargs = {
+            "params": params,
+            "headers": headers,
+            "json": json
+        }
+        if data is not None:
+            kwargs["content" if self._http2 else "data"] = data
+        if not self._http2:
+            kwargs["timeout"] = self._timeout
+
+        with self._get_host_semaphore_(url):
+            return self._session.request(method, url, **kwargs)
+
+    def _request_cached_(self, url, params, headers):
+        url = _join_params_(url, params)
+        headers = dict(headers or {})
+        key = HttpCache.get_key("GET", url, headers)
+        cached_response = self._cache.get(key)
+        if cached_response is not None:
+            headers.update(cached_response.conditional_headers)
+
+        response = self._request_("GET", url, headers=headers)
+        if response.status_code == 304 and cached_response is not None:
+            self._cache.touch(key)
+            # Headers of the 304 (rate limits among them) are fresher than the cached ones.
+            response_headers = dict(cached_response.headers)
+            response_headers.update((name.lower(), value) for name, value in response.headers.items())
+            return self._build_response_(url, response_headers, cached_response.body)
+
+        if response.status_code == 200:
+            self._cache.put(key, url, response.headers, response.content)
+
+        return response
+
+    # Build a 200 response of the session type from a cached body.
+    def _build_response_(self, url, headers, body):
+        for name in ("content-encoding", "content-length", "transfer-encoding"):
+            headers.pop(name, None)
+        if self._http2:
+            return self._httpx.Response(200, headers=headers, content=body, request=self._httpx.Request("GET", url))
+
+        response = requests.Response()
+        response.status_code = 200
+        response.url = url
+        response.headers = CaseInsensitiveDict(headers)
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+        response._content = body
+        return response
+
+    def get(self, url, params=None, headers=None, cache=False):
+        return self.request("GET", url, params=params, headers=headers, cache=cache)
+
+    def post(self, url, json=None, data=None, headers=None):
+        return self.request("POST", url, json=json, data=data, headers=headers)
+
+    async def request_async(self, method, url, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, contextvars.copy_context().run,
+                                          functools.partial(self.request, method, url, **kwargs))
+
+    # Issue GET requests concurrently, each item is a url or a dict of keyword arguments of get.
+    def fetch_all(self, requests_):
+        calls = []
+        for request in requests_:
+            if isinstance(request, str):
+                request = {"url": request}
+            calls.append(functools.partial(self.get, **request))
+
+        return run_all(calls)
+
+    def close(self):
+        self._session.close()
+        if self._recorder is not None:
+            self._recorder.close()
+
+
+# HTTP/2 is optional, it needs httpx installed with the h2 extra, and is only imported when asked for.
+def _import_httpx_():
+    try:
+        import httpx
+    except ImportError:
+        return None
+
+    return httpx
+
+
+def _join_params_(url, params):
+    if not params:
+        return url
+
+    return url + ("&" if "?" in url else "?") + urllib.parse.urlencode(sorted(params.items()), doseq=True)
+
+
+def _get_body_(json_, data):
+    if json_ is not None:
+        return json.dumps(json_).encode("utf-8")
+
+    return data
+
+
+# Run independent blocking callables concurrently, at most concurrency at once, results keep the order of callables.
+# Each callable runs in a copy of the caller's context, so its work is instrumented like the caller's.
+def run_all(callables, concurrency=RUN_ALL_CONCURRENCY):
+    callables = list(callables)
+    if len(callables) <= 1:
+        return [callable_() for callable_ in callables]
+
+    async def _run_():
+        loop = asyncio.get_running_loop()
+        results = [None] * len(callables)
+        indexes = iter(range(len(callables)))
+
+        # Workers take the next callable when they are done with one, so only concurrency are in flight.
+        async def _work_():
+            for i in indexes:
+                results[i] = await loop.run_in_executor(None, contextvars.copy_context().run, callables[i])
+
+        await asyncio.gather(*[_work_() for _ in range(min(concurrency, len(callables)))])
+        return results
+
+    return asyncio.run(_run_())
+
+
+# Call function, return (its result, None), or (None, the exception it raised) for run_all to go on.
+def call_catching(function, *args):
+    try:
+        return function(*args), None
+    except Exception as e:
+        return None, e
+
+
+_TRANSPORT = None
+_TRANSPORT_LOCK = threading.Lock()
+
+
+def get_transport():
+    global _TRANSPORT
+    if _TRANSPORT is None:
+        with _TRANSPORT_LOCK:
+            if _TRANSPORT is None:
+                record_path = os.getenv("OSS_RECORD_PATH")
+                _TRANSPORT = Transport(http2=os.getenv("OSS_HTTP2") == "1", cache=get_http_cache(),
+                                       replay_url=os.getenv("OSS_REPLAY_URL"),
+                                       recorder=FixtureRecorder(record_path) if record_path else None)
+
+    return _TRANSPORT
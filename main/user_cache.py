@@ -0,0 +1,111 @@
+"""
+
+Persistent cache of GitHub user profiles shared by all repositories.
+
+Profiles (company, followers, organization memberships) are kept in SQLite
+with the time they were fetched, and are fetched again once older than the
+TTL, so a prolific contributor is fetched at most once per TTL window no
+matter how many repositories of a batch they appear in.
+
+"""
+
+import os
+import json
+import time
+import sqlite3
+import functools
+import threading
+import collections
+
+from constants import USER_CACHE_PATH, USER_PROFILE_TTL
+from transport import run_all, call_catching
+
+# orgs is a tuple of organization logins, or None when the memberships have not been fetched.
+UserProfile = collections.namedtuple("UserProfile", ["login", "company", "followers", "orgs"])
+
+_SCHEMA_ = """
+create table if not exists user_profile (
+    login text primary key,
+    company text,
+    followers integer,
+    orgs text,
+    fetched_at real not null
+);
+"""
+
+
+class UserProfileCache:
+
+    def __init__(self, path=USER_CACHE_PATH, ttl=USER_PROFILE_TTL):
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Worker processes of a batch share the file, so wait for their writes.
+        self._connection = sqlite3.connect(path, timeout=60, check_same_thread=False)
+        self._connection.execute("pragma journal_mode = wal")
+        self._connection.executescript(_SCHEMA_)
+
+    def close(self):
+        self._connection.close()
+
+    def _read_(self, logins):
+        profiles = {}
+        min_fetched_at = time.time() - self._ttl
+        with self._lock:
+            for i in range(0, len(logins), 500):
+                chunk = logins[i: i + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._connection.execute(f"select login, company, followers, orgs from user_profile where "
+                                                f"fetched_at >= ? and login in ({placeholders})",
+                                                [min_fetched_at] + chunk)
+                for login, company, followers, orgs in rows:
+                    orgs = tuple(json.loads(orgs)) if orgs is not None else None
+                    profiles[login] = UserProfile(login, company, followers, orgs)
+
+        return profiles
+
+    def _write_(self, profiles):
+        rows = []
+        fetched_at = time.time()
+        for profile in profiles:
+            orgs = json.dumps(list(profile.orgs)) if profile.orgs is not None else None
+            rows.append((profile.login, profile.company, profile.followers, orgs, fetched_at))
+
+        with self._lock, self._connection:
+            self._connection.executemany("insert or replace into user_profile values (?, ?, ?, ?, ?)", rows)
+
+    # Return login -> UserProfile, fetch_profile(login, with_orgs) is called concurrently for missing or stale ones.
+    # fetch_profile returns None for users which do not exist anymore, they are left out of the result.
+    # Profiles fetched before a failure are written, so a retry only fetches the failed ones, then it is raised.
+    def get_profiles(self, logins, fetch_profile, with_orgs=False):
+        logins = list(dict.fromkeys(logins))
+        profiles = self._read_(logins)
+        missing_logins = [login for login in logins
+                          if login not in profiles or (with_orgs and profiles[login].orgs is None)]
+        if missing_logins:
+            results = run_all([functools.partial(call_catching, fetch_profile, login, with_orgs)
+                               for login in missing_logins])
+            self._write_([profile for profile, _ in results if profile is not None])
+            for login, (profile, _) in zip(missing_logins, results):
+                if profile is None:
+                    profiles.pop(login, None)
+                else:
+                    profiles[login] = profile
+            errors = [e for _, e in results if e is not None]
+            if errors:
+                raise errors[0]
+
+        return profiles
+
+
+_USER_PROFILE_CACHE = None
+
+
+def get_user_profile_cache():
+    global _USER_PROFILE_CACHE
+    if _USER_PROFILE_CACHE is None:
+        _USER_PROFILE_CACHE = UserProfileCache(os.getenv("USER_CACHE_PATH", USER_CACHE_PATH))
+
+    return _USER_PROFILE_CACHE
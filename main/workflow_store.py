@@ -0,0 +1,124 @@
+"""
+
+Workflow files of a repository, each fetched and parsed once per blob SHA.
+
+"""
+
+import os
+import pickle
+import functools
+import collections
+
+from constants import WORKFLOW_CACHE_PATH
+from exceptions import PageOpenException
+from transport import run_all
+
+
+# text is None when the blob could not be fetched, content is {} when it could not be parsed.
+Workflow = collections.namedtuple("Workflow", ["path", "sha", "text", "content"])
+
+
+class WorkflowStore:
+
+    def __init__(self, tree, fetch_text, cache_path=WORKFLOW_CACHE_PATH):
+        self._tree = tree
+        self._fetch_text = fetch_text
+        self._cache_path = cache_path
+        self._files = tuple(get_workflow_files(tree))
+        self._workflows = {}
+
+    @property
+    def files(self):
+        return self._files
+
+    def load(self, file):
+        workflow = self._workflows.get(file.sha)
+        if workflow is None:
+            workflow = self._read_cache_(file)
+            if workflow is None:
+                workflow = self._fetch_(file)
+                self._write_cache_(workflow)
+            self._workflows[file.sha] = workflow
+
+        # The same blob may live under several paths.
+        if workflow.path != file.path:
+            workflow = workflow._replace(path=file.path)
+
+        return workflow
+
+    def load_all(self):
+        # Workflows are independent of each other, so they are fetched concurrently.
+        return run_all([functools.partial(self.load, file) for file in self._files])
+
+    def _fetch_(self, file):
+        try:
+            text = self._fetch_text(file)
+        except PageOpenException:
+            return Workflow(file.path, file.sha, None, {})
+
+        return Workflow(file.path, file.sha, text, parse_workflow(text))
+
+    def _get_cache_file_(self, sha):
+        return os.path.join(self._cache_path, sha[:2], f"{sha}.pickle")
+
+    def _read_cache_(self, file):
+        if not self._cache_path:
+            return None
+
+        try:
+            with open(self._get_cache_file_(file.sha), "rb") as f:
+                text, content = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+
+        return Workflow(file.path, file.sha, text, content)
+
+    def _write_cache_(self, workflow):
+        # Failed fetches are retried on the next run.
+        if not self._cache_path or workflow.text is None:
+            return
+
+        cache_file = self._get_cache_file_(workflow.sha)
+        temp_file = f"{cache_file}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+            with open(temp_file, "wb") as f:
+                pickle.dump((workflow.text, workflow.content), f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_file, cache_file)
+        except OSError:
+            pass
+
+
+@functools.lru_cache(maxsize=None)
+def _get_yaml_loader_():
+    import yaml
+
+    # Prefer the LibYAML based loader, it is an order of magnitude faster.
+    return getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+
+def parse_workflow(text):
+    import yaml
+
+    try:
+        return yaml.load(text, Loader=_get_yaml_loader_())
+    except yaml.YAMLError:
+        return {}
+
+
+def is_workflow_file(file_path):
+    suffix = file_path.split(".")[-1]
+    if suffix == "yml" or suffix == "yaml":
+        return True
+    else:
+        return False
+
+
+# Return workflow files under .github/workflows/ of the given tree snapshot.
+def get_workflow_files(tree):
+    workflow_files = []
+    for file in tree.by_directory(".github/workflows/"):
+        if file.type == "blob" and is_workflow_file(file.path.lower()):
+            workflow_files.append(file)
+
+    return workflow_files